@@ -6,62 +6,43 @@ Literature Reference:
     - DOI: 10.1021/acs.jpclett.5b00831
 '''
 
-import copy
 import glob
-import numpy as np
-from itertools import chain
-from .utils.molecule import Molecule
+from .utils.reader import load_molecule
 from .utils.bag_handler import bag_updater
-from .utils.bag_handler import bag_organizer
-from .utils.calcs import length
+from .utils.bag_handler import bag_layout
+from .utils.bag_codes import pair_bag_terms
 
 
-def bag_of_bonds(mol_file, bags, bag_sizes):
+def bag_of_bonds(mol_file, bags, bag_sizes, out=None):
     '''
     Parameters
     ---------
-    mol_file: file
-        molecule file for reading in coordinates
+    mol_file: file, Molecule, or tuple
+        molecule file for reading in coordinates, an already parsed
+        Molecule (eg. from chemreps.utils.reader.read_molecules), or an
+        (at_num, xyz, connect) entry of a MoleculeBatch
     bags: dict
         dict of all bags for the dataset
-    bag_sizes: dict
-        dict of size of the largest bags in the dataset
+    bag_sizes: dict or BagLayout
+        dict of size of the largest bags in the dataset or its BagLayout
+    out: array
+        preallocated float16 vector to write the features into (eg. a row
+        of a feature matrix made with BagLayout.zeros)
 
     Returns
     -------
     bob: vector
         vector of all bonds in the molecule
     '''
-    # copy bags dict to ensure it does not get edited
-    bag_set = copy.deepcopy(bags)
-    current_molecule = Molecule(mol_file)
-    for i in range(current_molecule.n_atom):
-        for j in range(i, current_molecule.n_atom):
-            atomi = current_molecule.sym[i]
-            atomj = current_molecule.sym[j]
-            zi = current_molecule.at_num[i]
-            zj = current_molecule.at_num[j]
+    current_molecule = load_molecule(mol_file)
 
-            if i == j:
-                mii = 0.5 * zi ** 2.4
-                bag_set[atomi].append(mii)
+    # self interaction of every atom and Zi*Zj/rij of every pair i < j
+    codes, values = pair_bag_terms(current_molecule)
 
-            else:
-                if zj > zi:
-                        # swap ordering
-                    atomi, atomj = atomj, atomi
-                bond = "{}{}".format(atomi, atomj)
-
-                # rij = sqrt((xi - xj)^2 + (yi - yj)^2 + (zi - zj)^2)
-                rij = length(current_molecule, i, j)
-                mij = (zi * zj) / rij
-
-                bag_set[bond].append(mij)
-
-    # sort bags by magnitude, pad, concactenate
-    bob = bag_organizer(bag_set, bag_sizes)
-
-    # flatten bob into one list and store as a np.array
-    bob = np.array(list(chain.from_iterable(bob)), dtype=np.float16)
+    # sort bags by magnitude and write them into the output vector
+    layout = bag_layout(bag_sizes)
+    if out is None:
+        out = layout.zeros()
+    bob = layout.scatter(out, codes, values)
 
     return bob
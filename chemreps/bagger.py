@@ -11,14 +11,246 @@ Disclaimers:
       implemented as exactly as it is in the literature source
 '''
 
-import copy
+import os
 import glob
+import numbers
+import pickle
+import numpy as np
 from collections import OrderedDict
+from collections import deque
+from itertools import islice
+from multiprocessing import Pool
+from .utils.reader import iter_dataset
+from .utils.reader import load_molecule
+from .utils.reader import iter_symbols
 from .utils.molecule import Molecule
+from .utils.elements import to_z
+from .utils.index import MoleculeIndex
 from .utils.bag_handler import bag_updater
-from .utils.bag_handler import bag_organizer
-from .utils.graphs import gen_graph
-from .utils.graphs import dfs_connections
+from .utils.bag_handler import BagLayout
+from .utils.bag_codes import BASE
+from .utils.bag_codes import decode
+from .utils.bag_codes import key_to_code
+from .utils.bag_codes import count_codes
+from .utils.bag_codes import pair_bag_terms
+from .utils.bag_codes import bond_bag_codes
+
+
+def _check_bonds(molecule):
+    # Throw this error to avoid using non-sdf files due to lack of
+    # bond info in the files.
+    accepted_file_formats = ['sdf', 'mol', 'cml', 'batch']
+    if molecule.ftype not in accepted_file_formats:
+        raise NotImplementedError(
+            'file type \'{}\'  is unsupported. Accepted formats: {}.'.format(molecule.ftype, accepted_file_formats))
+
+
+def _count_bags(rep_strs, molecule):
+    '''
+    Counts the entries of each bag of a molecule for several representations
+    at once. The pair counts are shared by BoB and BAT and the topology is
+    only built once. Bags are keyed by bag code and only decoded into bag
+    keys once the whole dataset is sized.
+
+    Parameters
+    ---------
+    rep_strs: list
+        names of representations (ie. ['BoB', 'BAT'])
+    molecule: Molecule
+        current molecule
+
+    Returns
+    -------
+    bags: dict
+        number of entries in each bag (keyed by bag code) keyed by
+        representation
+    '''
+    bags = {}
+    if 'BAT' in rep_strs or 'JustBonds' in rep_strs:
+        _check_bonds(molecule)
+    if 'BoB' in rep_strs or 'BAT' in rep_strs:
+        # count the atoms and pairs in each bag
+        pair_bag = count_codes(pair_bag_terms(molecule, values=False)[0],
+                               decoded=False)
+    if 'BoB' in rep_strs:
+        bags['BoB'] = pair_bag
+    if 'BAT' in rep_strs:
+        # count the angles and torsions in each bag from the molecule's
+        # graph, angles, torsions, and their bag codes
+        bags['BAT'] = dict(pair_bag)
+        topology = molecule.topology
+        bags['BAT'].update(count_codes(topology.angle_codes, decoded=False))
+        bags['BAT'].update(count_codes(topology.torsion_codes, decoded=False))
+    if 'JustBonds' in rep_strs:
+        # count the atoms and bonds in each bag
+        bags['JustBonds'] = count_codes(bond_bag_codes(molecule), decoded=False)
+    return bags
+
+
+def _bag_sizes(rep_strs, molecules, start=0, keep_topologies=False):
+    '''
+    Sizes of the largest bags in an iterable of molecules
+
+    Parameters
+    ---------
+    rep_strs: list
+        names of representations (ie. ['BoB'])
+    molecules: iterable
+        Molecules to size the bags of
+    start: int
+        position of the first molecule in the dataset
+    keep_topologies: bool
+        also return the Topology of each molecule for BAT
+
+    Returns
+    -------
+    bag_sizes: dict
+        dict of size of the largest bags in the molecules (keyed by bag
+        code) keyed by representation
+    topologies: dict
+        Topology of each molecule keyed by normalized filename or position
+        if keep_topologies
+    '''
+    bag_sizes = {rep_str: {} for rep_str in rep_strs}
+    topologies = {}
+    for n, current_molecule in enumerate(molecules, start):
+        # update bag_sizes with larger value
+        for rep_str, bag in _count_bags(rep_strs, current_molecule).items():
+            bag_updater(bag, bag_sizes[rep_str])
+        if keep_topologies and 'BAT' in rep_strs:
+            if hasattr(current_molecule, 'fname'):
+                key = os.path.normpath(current_molecule.fname)
+            else:
+                key = n
+            topologies[key] = current_molecule.topology
+    return bag_sizes, topologies
+
+
+def _composition(sym):
+    # element counts of a molecule as ((Z, count), ...) in order of Z
+    at_num, counts = np.unique(to_z(sym), return_counts=True)
+    return tuple(zip(at_num.tolist(), counts.tolist()))
+
+
+def _composition_bag_sizes(compositions):
+    '''
+    Sizes of the largest BoB bags from element counts alone. An X bag has
+    n_X entries, an XY pair bag n_X*n_Y entries, and an XX pair bag
+    n_X*(n_X-1)/2 entries.
+
+    Parameters
+    ---------
+    compositions: iterable
+        element counts of each molecule from _composition
+
+    Returns
+    -------
+    bag_sizes: dict
+        dict of size of the largest bags in the molecules keyed by bag code
+    '''
+    bag_sizes = {}
+    # molecules with the same composition have the same bags
+    for composition in set(compositions):
+        bag = {}
+        for a, (za, na) in enumerate(composition):
+            bag[za] = na
+            if na > 1:
+                bag[za * BASE + za] = na * (na - 1) // 2
+            # larger atomic number first as in the pair bag codes
+            for zb, nb in composition[a+1:]:
+                bag[zb * BASE + za] = na * nb
+        bag_updater(bag, bag_sizes)
+    return bag_sizes
+
+
+def _index_file(fname, index_dir):
+    # sidecar index of a multi-record file (next to the file by default)
+    if index_dir is None:
+        return None
+    return os.path.join(index_dir, '{}.idx.npz'.format(os.path.basename(fname)))
+
+
+def _compact(item):
+    # Molecules are sent to workers as their arrays without any cached
+    # distances or topology. Filenames and batch entries are sent as is
+    if not isinstance(item, Molecule):
+        return item
+    compact = Molecule.from_arrays(item.at_num, item.xyz, item._connect)
+    compact.ftype = item.ftype
+    if hasattr(item, 'fname'):
+        compact.fname = item.fname
+    return compact
+
+
+def _split_dataset(dataset, n_chunks, index_dir=None, chunk_size=64):
+    '''
+    Splits a dataset into chunks that can be sent to worker processes. A
+    multi-record file is split into ranges of records read through its
+    MoleculeIndex so every worker only parses its own records. The index is
+    saved in index_dir (default: next to the file). Other datasets are read
+    lazily so a stream is never held in memory at once. Iterables with a
+    length are split into n_chunks chunks and other iterables into chunks
+    of chunk_size molecules.
+
+    Yields
+    -------
+    chunk: tuple or list
+        record range of a multi-record file or molecule files and compact
+        Molecules of the chunk
+    first: int
+        position of the first molecule of the chunk
+    '''
+    if isinstance(dataset, (str, os.PathLike)) and not os.path.isdir(dataset):
+        index_file = _index_file(dataset, index_dir)
+        index = MoleculeIndex(dataset, index_file)
+        n_mols = len(index)
+        index.close()
+        bounds = np.linspace(0, n_mols, n_chunks + 1).astype(int)
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            if b > a:
+                yield (dataset, index_file, int(a), int(b)), int(a)
+        return
+    if isinstance(dataset, (str, os.PathLike)):
+        dataset = glob.glob("{}/*".format(dataset))
+    if hasattr(dataset, '__len__'):
+        chunk_size = max(1, -(-len(dataset) // n_chunks))
+    items = iter(dataset)
+    first = 0
+    while True:
+        chunk = [_compact(item) for item in islice(items, chunk_size)]
+        if len(chunk) == 0:
+            return
+        yield chunk, first
+        first += len(chunk)
+
+
+def _chunk_molecules(chunk):
+    # molecules of a chunk made by _split_dataset
+    if isinstance(chunk, tuple):
+        fname, index_file, first, last = chunk
+        index = MoleculeIndex(fname, index_file)
+        try:
+            for k in range(first, last):
+                yield index[k]
+        finally:
+            index.close()
+    else:
+        for mol_file in chunk:
+            yield load_molecule(mol_file)
+
+
+def _chunk_bag_sizes(args):
+    # worker for sizing the bags of one chunk in a separate process
+    rep_strs, chunk, start, keep_topologies = args
+    return _bag_sizes(rep_strs, _chunk_molecules(chunk), start, keep_topologies)
+
+
+def _reduce_chunk(result, bag_sizes, topologies):
+    # merge the partial bag sizes and topologies of a chunk
+    chunk_sizes, chunk_topologies = result
+    for rep_str, sizes in chunk_sizes.items():
+        bag_updater(sizes, bag_sizes[rep_str])
+    topologies.update(chunk_topologies)
 
 
 class BagMaker:
@@ -29,12 +261,48 @@ class BagMaker:
     ----------
     rep_str : str
         name of representation (ie. 'BoB')
-    dataset : path
-        path to all molecules in the dataset
+    dataset : path or iterable
+        path to all molecules in the dataset, a multi-record sdf/xyz file,
+        or an iterable of molecule files and/or Molecules
+    layout : BagLayout
+        offset and width of each bag in the feature vector
+    keep_topologies : bool
+        keep the Topology of every molecule made while sizing BAT bags so it
+        can be passed to chemreps.bat.bat instead of being rebuilt
+    topologies : dict
+        Topology of each molecule keyed by normalized filename (or position
+        in the dataset for molecules without a file) if keep_topologies
+    n_jobs : int
+        number of worker processes used to size the bags. Each worker sizes
+        the bags of chunks of the dataset and the partial bag sizes are
+        merged with bag_updater. None or 1 sizes the bags serially and -1
+        uses all cores. A multi-record file is split with a MoleculeIndex,
+        which saves a '<file>.idx.npz' sidecar next to the file unless
+        index_dir is given. Other iterables are read lazily in chunks by
+        the main process and in-memory Molecules are sent to the workers as
+        their arrays only, so only pass filenames or a path to also parse
+        the molecules in parallel
+    composition : bool
+        size BoB bags in closed form from the element counts of each
+        molecule read without parsing the geometry. This is done serially
+        and ignores n_jobs
+    index_dir : path
+        directory for the MoleculeIndex sidecars made when n_jobs splits a
+        multi-record file (eg. when the data directory is read-only)
     """
     __accepted_reps = ['BoB', 'BAT', 'JustBonds']
 
-    def __init__(self, rep_str=None, dataset=None):
+    def __init__(self, rep_str=None, dataset=None, keep_topologies=False,
+                 n_jobs=None, composition=False, index_dir=None):
+        if n_jobs is not None and n_jobs != -1 and (not isinstance(n_jobs, numbers.Integral) or n_jobs < 1):
+            raise ValueError(
+                'n_jobs must be None, -1 or >= 1, not {}.'.format(n_jobs))
+        self.rep_str = None
+        self.keep_topologies = keep_topologies
+        self.n_jobs = n_jobs
+        self.composition = composition
+        self.index_dir = index_dir
+        self.topologies = {}
         if (rep_str and dataset) is not None:
             self.rep(rep_str, dataset)
         return None
@@ -51,69 +319,208 @@ class BagMaker:
             raise NotImplementedError(
                 'Representation \'{}\' is unsupported. Accepted representations are {} .'.format(rep_str, accept_reps))
 
-    def bob(self, dataset):
+    @classmethod
+    def multi(cls, rep_strs, dataset, keep_topologies=False, n_jobs=None,
+              index_dir=None):
         '''
-        Bag maker for Bag of Bonds representation
+        Bag maker for several representations from a single pass over the
+        dataset. Every molecule is parsed once and its pairs are counted
+        and its topology is built once for all of the representations.
 
         Parameters
         ---------
-        dataset: path
-            path to all molecules in the dataset
+        rep_strs: list
+            names of representations (ie. ['BoB', 'BAT', 'JustBonds'])
+        dataset: path or iterable
+            path to all molecules in the dataset, a multi-record sdf/xyz
+            file, or an iterable of molecule files and/or Molecules
+        keep_topologies: bool
+            keep the Topology of every molecule for BAT
+        n_jobs: int
+            number of worker processes used to size the bags
+        index_dir: path
+            directory for MoleculeIndex sidecars (see BagMaker)
 
         Returns
         -------
-        bags: dict
-            dict of all bags for the dataset
-        bag_sizes: dict
-            dict of size of the largest bags in the dataset
+        bag_makers: OrderedDict
+            BagMaker with the bags, bag_sizes, and layout of each
+            representation
         '''
-        # iterate through all of the molecules in the dataset
-        #   and get the sizes of the largest bags
-        self.bag_sizes = {}
-        for mol_file in glob.iglob("{}/*".format(dataset)):
-            current_molecule = Molecule(mol_file)
-            # build bags
-            bond_bag = {}
-            for i in range(current_molecule.n_atom):
-                for j in range(i, current_molecule.n_atom):
-                    atomi = current_molecule.sym[i]
-                    atomj = current_molecule.sym[j]
-                    zi = current_molecule.at_num[i]
-                    zj = current_molecule.at_num[j]
-                    if i == j:
-                        if atomi in bond_bag:
-                            bond_bag[atomi] += 1
-                        else:
-                            bond_bag[atomi] = 1
-                    else:
-                        if zj > zi:
-                            atomi, atomj = atomj, atomi
-                        bond = "{}{}".format(atomi, atomj)
-                        if bond in bond_bag:
-                            bond_bag[bond] += 1
-                        else:
-                            bond_bag[bond] = 1
-
-            # update bag_sizes with larger value
-            bag_updater(bond_bag, self.bag_sizes)
-
-        # order bags alphabetically
-        self.bag_sizes = OrderedDict(
-            sorted(self.bag_sizes.items(), key=lambda t: t[0]))
+        for rep_str in rep_strs:
+            if rep_str not in BagMaker.__accepted_reps:
+                accept_reps = str(BagMaker.__accepted_reps).strip('[]')
+                raise NotImplementedError(
+                    'Representation \'{}\' is unsupported. Accepted representations are {} .'.format(rep_str, accept_reps))
+        sizer = cls(keep_topologies=keep_topologies, n_jobs=n_jobs,
+                    index_dir=index_dir)
+        bag_sizes = sizer._size_bags(rep_strs, dataset)
+        bag_makers = OrderedDict()
+        for rep_str in rep_strs:
+            bag_makers[rep_str] = cls(keep_topologies=keep_topologies,
+                                      n_jobs=n_jobs, index_dir=index_dir)
+            if rep_str == 'BAT':
+                bag_makers[rep_str].topologies = sizer.topologies
+            bag_makers[rep_str].rep_str = rep_str
+            bag_makers[rep_str]._set_bags(bag_sizes[rep_str])
+        return bag_makers
+
+    def _size_bags(self, rep_strs, dataset):
+        # size the bags serially or map chunks of the dataset to workers
+        # and reduce their partial bag sizes
+        start = len(self.topologies)
+        if self.n_jobs is None or self.n_jobs == 1:
+            bag_sizes, topologies = _bag_sizes(
+                rep_strs, iter_dataset(dataset), start, self.keep_topologies)
+        else:
+            n_jobs = os.cpu_count() if self.n_jobs < 0 else self.n_jobs
+            chunks = _split_dataset(dataset, 4 * n_jobs, self.index_dir)
+            bag_sizes = {rep_str: {} for rep_str in rep_strs}
+            topologies = {}
+            with Pool(n_jobs) as pool:
+                # only a few chunks are in flight so a stream is read as
+                # the workers need it
+                pending = deque()
+                for chunk, first in chunks:
+                    task = (rep_strs, chunk, start + first, self.keep_topologies)
+                    pending.append(pool.apply_async(_chunk_bag_sizes, (task,)))
+                    if len(pending) >= 2 * n_jobs:
+                        _reduce_chunk(pending.popleft().get(), bag_sizes, topologies)
+                while pending:
+                    _reduce_chunk(pending.popleft().get(), bag_sizes, topologies)
+        self.topologies.update(topologies)
+        return bag_sizes
+
+    def _set_bags(self, code_sizes):
+        # decode the bag codes once per bag and order bags alphabetically
+        bag_sizes = zip(decode(list(code_sizes.keys())), code_sizes.values())
+        self.bag_sizes = OrderedDict(sorted(bag_sizes, key=lambda t: t[0]))
 
         # make empty bags to fill
         self.bags = {}
         bag_keys = list(self.bag_sizes.keys())
         for i in range(len(bag_keys)):
             self.bags.update({bag_keys[i]: []})
+        self.layout = BagLayout(self.bag_sizes)
+
+    def _new_bag_sizes(self, rep_str, dataset):
+        if rep_str == 'BoB' and self.composition:
+            compositions = (_composition(sym) for sym in iter_symbols(dataset))
+            return _composition_bag_sizes(compositions)
+        return self._size_bags([rep_str], dataset)[rep_str]
+
+    def _make_bags(self, rep_str, dataset):
+        self.rep_str = rep_str
+        self._set_bags(self._new_bag_sizes(rep_str, dataset))
+
+    def update(self, dataset):
+        '''
+        Updates the bag sizes with new molecules without resizing the bags
+        of the molecules that were already seen
+
+        Parameters
+        ---------
+        dataset: path or iterable
+            path to the new molecules, a multi-record sdf/xyz file, or an
+            iterable of molecule files and/or Molecules
+
+        Returns
+        -------
+        changed: bool
+            True if the layout changed and feature vectors made with the
+            previous layout need to be re-padded
+        grown: OrderedDict
+            (previous size, new size) of every bag that grew. The previous
+            size is None for new bags
+        '''
+        if self.rep_str is None:
+            raise Exception('BagMaker has no bags to update. Make bags first.')
+        code_sizes = dict(zip(self.layout.codes.tolist(),
+                              self.layout.sizes.tolist()))
+        new_sizes = self._new_bag_sizes(self.rep_str, dataset)
+        grown = []
+        for code, size in new_sizes.items():
+            previous = code_sizes.get(code)
+            if previous is None or size > previous:
+                grown.append((decode(code), (previous, size)))
+        grown = OrderedDict(sorted(grown, key=lambda t: t[0]))
+        if len(grown) > 0:
+            bag_updater(new_sizes, code_sizes)
+            self._set_bags(code_sizes)
+        return len(grown) > 0, grown
+
+    def save(self, fname):
+        '''
+        Saves the representation, bag sizes, and options to a pickle file
+
+        Parameters
+        ---------
+        fname: string
+            file to write
+        '''
+        state = {'rep_str': self.rep_str,
+                 'bag_sizes': self.bag_sizes,
+                 'keep_topologies': self.keep_topologies,
+                 'topologies': self.topologies,
+                 'n_jobs': self.n_jobs,
+                 'index_dir': self.index_dir,
+                 'composition': self.composition}
+        with open(fname, 'wb') as f:
+            pickle.dump(state, f)
+
+    @classmethod
+    def load(cls, fname):
+        '''
+        Loads a BagMaker saved with BagMaker.save
+
+        Parameters
+        ---------
+        fname: string
+            file to read
+
+        Returns
+        -------
+        bagger: BagMaker
+            BagMaker with the saved bags, bag sizes, and layout
+        '''
+        with open(fname, 'rb') as f:
+            state = pickle.load(f)
+        bagger = cls(keep_topologies=state['keep_topologies'],
+                     n_jobs=state['n_jobs'], composition=state['composition'],
+                     index_dir=state.get('index_dir'))
+        bagger.rep_str = state['rep_str']
+        bagger.topologies = state['topologies']
+        bagger._set_bags({key_to_code(key): size
+                          for key, size in state['bag_sizes'].items()})
+        return bagger
+
+    def bob(self, dataset):
+        '''
+        Bag maker for Bag of Bonds representation
+
+        Parameters
+        ---------
+        dataset: path or iterable
+            path to all molecules in the dataset, a multi-record sdf/xyz
+            file, or an iterable of molecule files and/or Molecules
+
+        Returns
+        -------
+        bags: dict
+            dict of all bags for the dataset
+        bag_sizes: dict
+            dict of size of the largest bags in the dataset
+        '''
+        self._make_bags('BoB', dataset)
 
     def bat(self, dataset):
         '''
         Bag maker for Bond Angle Torsion (BAT) representation
         Parameters
         ---------
-        dataset: path
-            path to all molecules in the dataset
+        dataset: path or iterable
+            path to all molecules in the dataset, a multi-record sdf/xyz
+            file, or an iterable of molecule files and/or Molecules
 
         Returns
         -------
@@ -122,117 +529,7 @@ class BagMaker:
         bag_sizes: dict
             dict of size of the largest bags in the dataset
         '''
-        accepted_file_formats = ['sdf', 'mol', 'cml']
-        # iterate through all of the molecules in the dataset
-        #   and get the sizes of the largest bags
-        bond_sizes = {}
-        angle_sizes = {}
-        torsion_sizes = {}
-        for mol_file in glob.iglob("{}/*".format(dataset)):
-            current_molecule = Molecule(mol_file)
-            if current_molecule.ftype not in accepted_file_formats:
-                raise NotImplementedError(
-                    'file type \'{}\'  is unsupported. Accepted formats: {}.'.format(current_molecule.ftype, accepted_file_formats))
-            # build bags
-            bond_bag = {}
-            angle_bag = {}
-            torsion_bag = {}
-
-            # grab bonds/nonbonds
-            for i in range(current_molecule.n_atom):
-                for j in range(i, current_molecule.n_atom):
-                    atomi = current_molecule.sym[i]
-                    atomj = current_molecule.sym[j]
-                    zi = current_molecule.at_num[i]
-                    zj = current_molecule.at_num[j]
-                    if i == j:
-                        if atomi in bond_bag:
-                            bond_bag[atomi] += 1
-                        else:
-                            bond_bag[atomi] = 1
-                    else:
-                        if zj > zi:
-                            atomi, atomj = atomj, atomi
-                        bond = "{}{}".format(atomi, atomj)
-                        if bond in bond_bag:
-                            bond_bag[bond] += 1
-                        else:
-                            bond_bag[bond] = 1
-
-            # update bag_sizes with larger value
-            bag_updater(bond_bag, bond_sizes)
-
-            # generate connectivity graph
-            graph = gen_graph(current_molecule.connect,
-                              current_molecule.n_atom)
-
-            # grab angles using depth first approach
-            angles = []
-            for atom in graph:
-                # set length to 3 for angles
-                dfs_connections(graph, atom, 3, angles)
-
-            # iterate over angles and make bags
-            # .. TODO: can probably clean this up to use dfs
-            angle = []
-            for ang in angles:
-                a = current_molecule.sym[ang[0] - 1]
-                b = current_molecule.sym[ang[1] - 1]
-                c = current_molecule.sym[ang[2] - 1]
-                if c < a:
-                    # swap for lexographic order
-                    a, c = c, a
-                abc = a + b + c
-                angle.append(abc)
-
-            for i in range(len(angle)):
-                if angle[i] in angle_bag:
-                    angle_bag[angle[i]] += 1
-                else:
-                    angle_bag[angle[i]] = 1
-
-            # update bag_sizes with larger value
-            bag_updater(angle_bag, angle_sizes)
-
-            # grab torsions using depth first approach
-            torsions = []
-            for atom in graph:
-                # set length to 4 for torsions
-                dfs_connections(graph, atom, 4, torsions)
-
-            # iterate over torsions and calculate theta
-            torsion = []
-            for tor in torsions:
-                a_sym = current_molecule.sym[tor[0] - 1]
-                b_sym = current_molecule.sym[tor[1] - 1]
-                c_sym = current_molecule.sym[tor[2] - 1]
-                d_sym = current_molecule.sym[tor[3] - 1]
-                if d_sym < a_sym:
-                    # swap for lexographic order
-                    a_sym, b_sym, c_sym, d_sym = d_sym, c_sym, b_sym, a_sym
-                abcd = a_sym + b_sym + c_sym + d_sym
-                torsion.append(abcd)
-            for i in range(len(torsion)):
-                if torsion[i] in torsion_bag:
-                    torsion_bag[torsion[i]] += 1
-                else:
-                    torsion_bag[torsion[i]] = 1
-
-            # update bag_sizes with larger value
-            bag_updater(torsion_bag, torsion_sizes)
-
-        self.bag_sizes = bond_sizes.copy()
-        self.bag_sizes.update(angle_sizes)
-        self.bag_sizes.update(torsion_sizes)
-        # order bags alphabetically
-        self.bag_sizes = OrderedDict(
-            sorted(self.bag_sizes.items(), key=lambda t: t[0]))
-
-        # make empty bags to fill
-        self.bags = {}
-        bag_keys = list(self.bag_sizes.keys())
-        for i in range(len(bag_keys)):
-            self.bags.update({bag_keys[i]: []})
+        self._make_bags('BAT', dataset)
 
     def jb(self, dataset):
         '''
@@ -240,8 +537,9 @@ class BagMaker:
 
         Parameters
         ---------
-        dataset: path
-            path to all molecules in the dataset
+        dataset: path or iterable
+            path to all molecules in the dataset, a multi-record sdf/xyz
+            file, or an iterable of molecule files and/or Molecules
 
         Returns
         -------
@@ -250,57 +548,4 @@ class BagMaker:
         bag_sizes: dict
             dict of size of the largest bags in the dataset
         '''
-        accepted_file_formats = ['sdf', 'mol', 'cml']
-        # iterate through all of the molecules in the dataset
-        #   and get the sizes of the largest bags
-        self.bag_sizes = {}
-        for mol_file in glob.iglob("{}/*".format(dataset)):
-            current_molecule = Molecule(mol_file)
-            # Throw this error to avoid using non-sdf files due to lack of
-            # bond info in the files.
-            if current_molecule.ftype not in accepted_file_formats:
-                raise NotImplementedError(
-                    'file type \'{}\'  is unsupported. Accepted formats: {}.'.format(current_molecule.ftype, accepted_file_formats))
-            # build bags
-            bond_bag = {}
-            for i in range(current_molecule.n_atom):
-                for j in range(i, current_molecule.n_atom):
-                    atomi = current_molecule.sym[i]
-                    atomj = current_molecule.sym[j]
-                    zi = current_molecule.at_num[i]
-                    zj = current_molecule.at_num[j]
-                    if i == j:
-                        if atomi in bond_bag:
-                            bond_bag[atomi] += 1
-                        else:
-                            bond_bag[atomi] = 1
-
-            for i in range(current_molecule.n_connect):
-                # Grab the bonds from current_molecule.connect and convert to atom
-                # symbol. The subtract 1 is needed as the list values start at 1
-                # but indexing starts at 0 so we need to to grab the right symbol.
-                a = int(current_molecule.connect[i][0]) - 1
-                b = int(current_molecule.connect[i][1]) - 1
-                a_sym = current_molecule.sym[a]
-                b_sym = current_molecule.sym[b]
-                if b_sym > a_sym:
-                    # swap for lexographic order
-                    a_sym, b_sym = b_sym, a_sym
-                bond = "{}{}".format(a_sym, b_sym)
-                if bond in bond_bag:
-                    bond_bag[bond] += 1
-                else:
-                    bond_bag[bond] = 1
-
-            # update bag_sizes with larger value
-            bag_updater(bond_bag, self.bag_sizes)
-
-        # order bags alphabetically
-        self.bag_sizes = OrderedDict(
-            sorted(self.bag_sizes.items(), key=lambda t: t[0]))
-
-        # make empty bags to fill
-        self.bags = {}
-        bag_keys = list(self.bag_sizes.keys())
-        for i in range(len(bag_keys)):
-            self.bags.update({bag_keys[i]: []})
+        self._make_bags('JustBonds', dataset)
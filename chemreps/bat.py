@@ -12,115 +12,63 @@ Disclaimers:
       implemented as exactly as it is in the literature source
 '''
 
-import copy
 import glob
 import numpy as np
-from itertools import chain
 from collections import OrderedDict
-from .utils.molecule import Molecule
+from .utils.reader import load_molecule
 from .utils.bag_handler import bag_updater
-from .utils.bag_handler import bag_organizer
-from .utils.calcs import length
-from .utils.calcs import angle
-from .utils.calcs import torsion
-from .utils.graphs import gen_graph
-from .utils.graphs import dfs_connections
+from .utils.bag_handler import bag_layout
+from .utils.bag_codes import pair_bag_terms
+from .utils.calcs import angles
+from .utils.calcs import torsions
 
 
-def bat(mol_file, bags, bag_sizes):
+def bat(mol_file, bags, bag_sizes, topology=None, out=None):
     '''
     Parameters
     ---------
-    mol_file: file
-        molecule file for reading in coordinates
+    mol_file: file, Molecule, or tuple
+        molecule file for reading in coordinates, an already parsed
+        Molecule (eg. from chemreps.utils.reader.read_molecules), or an
+        (at_num, xyz, connect) entry of a MoleculeBatch
     bags: dict
         dict of all bags for the dataset
-    bag_sizes: dict
-        dict of size of the largest bags in the dataset
+    bag_sizes: dict or BagLayout
+        dict of size of the largest bags in the dataset or its BagLayout
+    topology: Topology
+        precomputed topology of the molecule (eg. from BagMaker.topologies).
+        If not given the molecule's cached topology is used
+    out: array
+        preallocated float16 vector to write the features into (eg. a row
+        of a feature matrix made with BagLayout.zeros)
 
     Returns
     -------
     bat: vector
         vector of all bonds, angles, torsions in the molecule
     '''
-    accepted_file_formats = ['sdf', 'mol', 'cml']
-    # copy bags dict to ensure it does not get edited
-    bag_set = copy.deepcopy(bags)
-    current_molecule = Molecule(mol_file)
+    accepted_file_formats = ['sdf', 'mol', 'cml', 'batch']
+    current_molecule = load_molecule(mol_file)
     if current_molecule.ftype not in accepted_file_formats:
         raise NotImplementedError(
             'file type \'{}\'  is unsupported. Accepted formats: {}.'.format(current_molecule.ftype, accepted_file_formats))
-    # grab bonds/nonbonds
-    for i in range(current_molecule.n_atom):
-        for j in range(i, current_molecule.n_atom):
-            atomi = current_molecule.sym[i]
-            atomj = current_molecule.sym[j]
-            zi = current_molecule.at_num[i]
-            zj = current_molecule.at_num[j]
+    # self interaction of every atom and Zi*Zj/rij of every pair i < j
+    pair_codes, pair_values = pair_bag_terms(current_molecule)
 
-            if i == j:
-                mii = 0.5 * zi ** 2.4
-                bag_set[atomi].append(mii)
-            else:
-                if zj > zi:
-                    # swap ordering
-                    atomi, atomj = atomj, atomi
-                bond = "{}{}".format(atomi, atomj)
-                rij = length(current_molecule, i, j)
-                mij = (zi * zj) / rij
-                bag_set[bond].append(mij)
+    # graph, angles, torsions, and their bag codes computed once per molecule
+    if topology is None:
+        topology = current_molecule.topology
+    # all angles and dihedrals at once
+    theta = angles(current_molecule.xyz, topology.angles).astype(np.float16)
+    phi = torsions(current_molecule.xyz, topology.torsions).astype(np.float16)
 
-    # generate connectivity graph
-    graph = gen_graph(current_molecule.connect, current_molecule.n_atom)
-
-    # grab angles using depth first approach
-    angles = []
-    for atom in graph:
-        # set length to 3 for angles
-        dfs_connections(graph, atom, 3, angles)
-
-    # iterate over angles and calculate theta
-    for ang in angles:
-        k_c = ang[0] - 1
-        i_c = ang[1] - 1
-        l_c = ang[2] - 1
-        a = current_molecule.sym[k_c]
-        b = current_molecule.sym[i_c]
-        c = current_molecule.sym[l_c]
-        if c < a:
-            # swap for lexographic order
-            a, c = c, a
-        abc = a + b + c
-        theta = angle(current_molecule, k_c, i_c, l_c)
-        bag_set[abc].append(theta)
-
-    # grab torsions using depth first approach
-    torsions = []
-    for atom in graph:
-        # set length to 4 for torsions
-        dfs_connections(graph, atom, 4, torsions)
-
-    # iterate over torsions and calculate theta
-    for tor in torsions:
-        a = tor[0] - 1
-        b = tor[1] - 1
-        c = tor[2] - 1
-        d = tor[3] - 1
-        a_sym = current_molecule.sym[a]
-        b_sym = current_molecule.sym[b]
-        c_sym = current_molecule.sym[c]
-        d_sym = current_molecule.sym[d]
-        if d_sym < a_sym:
-            # swap for lexographic order
-            a_sym, b_sym, c_sym, d_sym = d_sym, c_sym, b_sym, a_sym
-        abcd = a_sym + b_sym + c_sym + d_sym
-        theta = torsion(current_molecule, a, b, c, d)
-        bag_set[abcd].append(theta)
-
-    # sort bags by magnitude, pad, concactenate
-    bat = bag_organizer(bag_set, bag_sizes)
-
-    # flatten bob into one list and store as a np.array
-    bat = np.array(list(chain.from_iterable(bat)), dtype=np.float16)
+    values = np.concatenate((pair_values, theta, phi))
+    codes = np.concatenate((pair_codes,
+                            topology.angle_codes, topology.torsion_codes))
+    # sort bags by magnitude and write them into the output vector
+    layout = bag_layout(bag_sizes)
+    if out is None:
+        out = layout.zeros()
+    bat = layout.scatter(out, codes, values)
 
     return bat
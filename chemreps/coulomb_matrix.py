@@ -7,45 +7,250 @@ Literature Reference:
 '''
 
 import numpy as np
-from .utils.molecule import Molecule
-from .utils.calcs import length
+from .utils.batch import MoleculeBatch
+from .utils.reader import load_molecule
+from .utils.reader import iter_dataset
+from .utils.elements import self_interaction
 
+# largest number of distance matrix elements computed at once per atom count
+_chunk_elements = 2 ** 22
 
-def coulomb_matrix(mol_file, size=29):
+# accepted CM variants
+_accepted_modes = ['unsorted', 'sorted', 'eigenspectrum']
+
+
+def _triangle_size(size):
+    # the size of the lower triangle of a symmetric matrix is a triangle number
+    # given by "n+1 choose 2" (binomial coefficient)
+    return (int)((size*(size+1))/2)
+
+
+def _check_size(n_atom, size):
+    # check to make sure # atoms is not larger than desired matrix size
+    if n_atom > size:
+        raise Exception(
+            'Molecule has {} atoms. Increase matrix size.'.format(n_atom))
+
+
+def _stack_distances(xyz):
+    # distance matrices of a stack of molecules with the same number of atoms
+    # using the same operations as calcs.distance_matrix
+    xyz = np.asarray(xyz, dtype=np.float64)
+    d = xyz[:, :, np.newaxis, :] - xyz[:, np.newaxis, :, :]
+    return np.sqrt((d[..., 0] ** 2) + (d[..., 1] ** 2) + (d[..., 2] ** 2))
+
+
+def _cm_triangles(at_num, dist, out):
+    '''
+    Fills the lower triangles of the CMs of molecules with the same number
+    of atoms. Row i of the lower triangle starts at i*(i+1)/2 regardless of
+    the matrix size so the n_atom triangle is the start of every row of out.
+
+    Parameters
+    ---------
+    at_num: array
+        atomic numbers. Size: (n_mols,n_atom)
+    dist: array
+        distance matrices. Size: (n_mols,n_atom,n_atom)
+    out: array
+        float16 triangle matrices to fill. Size: (n_mols,>=n_atom(n_atom+1)/2)
+    '''
+    at_num = np.asarray(at_num, dtype=np.int64)
+    i, j = np.tril_indices(at_num.shape[1])
+    diag = i == j
+    # 0.5*Zi^2.4 on the diagonal
+    out[:, np.flatnonzero(diag)] = self_interaction[at_num]
+    # Zi*Zj/rij off the diagonal with rij rounded to float16
+    i, j = i[~diag], j[~diag]
+    rij = dist[:, i, j].astype(np.float16)
+    out[:, np.flatnonzero(~diag)] = (at_num[:, i] * at_num[:, j]).astype(np.float16) / rij
+    return out
+
+
+def _check_mode(mode):
+    if mode not in _accepted_modes:
+        accept_modes = str(_accepted_modes).strip('[]')
+        raise NotImplementedError(
+            'CM mode \'{}\' is unsupported. Accepted modes are {} .'.format(mode, accept_modes))
+
+
+def _unpack(mats, size):
+    # zero padded symmetric matrices of packed triangles
+    i, j = np.tril_indices(size)
+    sq = np.zeros((len(mats), size, size))
+    sq[:, i, j] = mats
+    sq[:, j, i] = mats
+    return sq
+
+
+def _normalize(mats, size, mode):
+    '''
+    Makes triangle CMs independent of atom order by sorting the rows and
+    columns by row norm or by taking the eigenvalue spectrum. The triangles
+    are unpacked into zero-padded (n_mols,size,size) matrices in chunks and
+    each chunk is sorted or diagonalized with one call.
+
+    Parameters
+    ---------
+    mats: array
+        float16 triangle CM matrices. Size: (n_mols,size(size+1)/2)
+    size: int
+        size of CM matrices
+    mode: string
+        'sorted' or 'eigenspectrum'
+
+    Returns
+    -------
+    mats: array
+        sorted triangle CMs. Size: (n_mols,size(size+1)/2) or eigenvalues
+        sorted by decreasing absolute value. Size: (n_mols,size)
+    '''
+    i, j = np.tril_indices(size)
+    width = len(i) if mode == 'sorted' else size
+    out = np.zeros((len(mats), width), dtype=np.float16)
+    chunk = max(1, _chunk_elements // (size * size))
+    for k in range(0, len(mats), chunk):
+        sq = _unpack(mats[k:k+chunk], size)
+        if mode == 'sorted':
+            # padding rows have zero norm so they stay at the end
+            norms = np.linalg.norm(sq, axis=2)
+            order = np.argsort(-norms, axis=1, kind='stable')
+            sq = np.take_along_axis(sq, order[:, :, np.newaxis], axis=1)
+            sq = np.take_along_axis(sq, order[:, np.newaxis, :], axis=2)
+            out[k:k+chunk] = sq[:, i, j]
+        else:
+            eigs = np.linalg.eigvalsh(sq)
+            order = np.argsort(-np.abs(eigs), axis=1, kind='stable')
+            out[k:k+chunk] = np.take_along_axis(eigs, order, axis=1)
+    return out
+
+
+def coulomb_matrix(mol_file, size=29, mode='unsorted'):
     '''
     Parameters
     ---------
-    mol_file: string
-        molecule filename for reading in coordinates
+    mol_file: string, Molecule, or tuple
+        molecule filename for reading in coordinates, an already parsed
+        Molecule (eg. from chemreps.utils.reader.read_molecules), or an
+        (at_num, xyz, connect) entry of a MoleculeBatch
     size: int
         size of CM matrix
+    mode: string
+        'unsorted' for the CM in file atom order, 'sorted' for the CM with
+        rows and columns sorted by decreasing row norm, or 'eigenspectrum'
+        for the eigenvalues sorted by decreasing absolute value
 
     Returns
     -------
     mat: triangle matrix
-        triangle CM matrix
+        triangle CM matrix (or eigenvalues of size size for 'eigenspectrum')
     '''
-    current_molecule = Molecule(mol_file)
-    # check to make sure # atoms is not larger than desired matrix size
-    if current_molecule.n_atom > size:
-        raise Exception(
-            'Molecule has {} atoms. Increase matrix size.'.format(current_molecule.n_atom))
-    # build CM matrix
-    # the size of the lower triangle of a symmetric matrix is a triangle number
-    # given by "n+1 choose 2" (binomial coefficient)
-    mat = np.zeros((int)((size*(size+1))/2), dtype=np.float16)
-    count = 0
-    for i in range(current_molecule.n_atom):
-        for j in range(i+1):
-            zi = current_molecule.at_num[i]
-            zj = current_molecule.at_num[j]
-            if i == j:
-                zij = 0.5 * zi ** 2.4
-                mat[count] = zij
-            else:
-                # rij = sqrt((xi - xj)^2 + (yi - yj)^2 + (zi - zj)^2)
-                rij = length(current_molecule, i, j)
-                mij = (zi * zj) / rij
-                mat[count] = mij
-            count += 1
-    return mat
+    _check_mode(mode)
+    current_molecule = load_molecule(mol_file)
+    _check_size(current_molecule.n_atom, size)
+    # build CM matrix from the molecule's cached distance matrix
+    mat = np.zeros((1, _triangle_size(size)), dtype=np.float16)
+    _cm_triangles(np.asarray(current_molecule.at_num)[np.newaxis, :],
+                  current_molecule.distances[np.newaxis, :, :], mat)
+    if mode != 'unsorted':
+        mat = _normalize(mat, size, mode)
+    return mat[0]
+
+
+def coulomb_matrices(mol_files, size=29, mode='unsorted'):
+    '''
+    Builds the CMs of many molecules at once. Molecules are grouped by
+    number of atoms and the CMs of each group are computed together with
+    broadcasting.
+
+    Parameters
+    ---------
+    mol_files: path, iterable, or MoleculeBatch
+        directory of molecule files, a multi-record sdf/xyz file, an
+        iterable of molecule filenames and/or Molecules, or a MoleculeBatch
+        (whose coordinates are stored as float32)
+    size: int
+        size of CM matrices
+    mode: string
+        'unsorted', 'sorted', or 'eigenspectrum' (see coulomb_matrix)
+
+    Returns
+    -------
+    mats: array
+        triangle CM matrix of each molecule in input order.
+        Size: (n_mols,size(size+1)/2) or (n_mols,size) for 'eigenspectrum'
+    '''
+    _check_mode(mode)
+    if isinstance(mol_files, MoleculeBatch):
+        n_atoms = mol_files.n_atoms
+        starts = mol_files.atom_offsets[:-1]
+        at_num = mol_files.at_num
+        xyz = mol_files.xyz
+    else:
+        at_nums = []
+        xyzs = []
+        for molecule in iter_dataset(mol_files):
+            at_nums.append(np.asarray(molecule.at_num, dtype=np.int64))
+            xyzs.append(np.asarray(molecule.xyz, dtype=np.float64).reshape(-1, 3))
+        n_atoms = np.array([len(z) for z in at_nums], dtype=np.int64)
+        starts = np.cumsum(n_atoms) - n_atoms
+        at_num = np.concatenate(at_nums) if at_nums else np.zeros(0, np.int64)
+        xyz = np.concatenate(xyzs) if xyzs else np.zeros((0, 3))
+
+    mats = np.zeros((len(n_atoms), _triangle_size(size)), dtype=np.float16)
+    for n_atom in np.unique(n_atoms):
+        n_atom = int(n_atom)
+        _check_size(n_atom, size)
+        mols = np.flatnonzero(n_atoms == n_atom)
+        chunk = max(1, _chunk_elements // max(1, n_atom * n_atom))
+        for k in range(0, len(mols), chunk):
+            rows = mols[k:k+chunk]
+            # gather the atoms of every molecule in the chunk
+            atoms = starts[rows][:, np.newaxis] + np.arange(n_atom)
+            mats[rows] = _cm_triangles(at_num[atoms], _stack_distances(xyz[atoms]),
+                                       mats[rows])
+    if mode != 'unsorted':
+        mats = _normalize(mats, size, mode)
+    return mats
+
+
+def random_sorted_coulomb_matrices(mol_files, size=29, n_samples=10, sigma=1.,
+                                   random_state=None):
+    '''
+    Generates randomly sorted CMs for data augmentation. The CM of each
+    molecule is computed once and n_samples copies are sorted by row norms
+    with added gaussian noise.
+
+    Parameters
+    ---------
+    mol_files: path or iterable
+        directory of molecule files, a multi-record sdf/xyz file, or an
+        iterable of molecule filenames and/or Molecules
+    size: int
+        size of CM matrices
+    n_samples: int
+        number of randomly sorted CMs per molecule
+    sigma: float
+        standard deviation of the noise added to the row norms
+    random_state: int or RandomState
+        seed or random number generator for reproducible sorting
+
+    Yields
+    -------
+    mats: array
+        randomly sorted triangle CMs of each molecule.
+        Size: (n_samples,size(size+1)/2)
+    '''
+    if not isinstance(random_state, np.random.RandomState):
+        random_state = np.random.RandomState(random_state)
+    for molecule in iter_dataset(mol_files):
+        n_atom = molecule.n_atom
+        sq = _unpack(coulomb_matrix(molecule, size)[np.newaxis, :], size)[0]
+        norms = np.linalg.norm(sq, axis=1)[:n_atom]
+        # sort each copy by its noisy row norms
+        noise = random_state.normal(0., sigma, size=(n_samples, n_atom))
+        order = np.argsort(-(norms + noise), axis=1, kind='stable')
+        i, j = np.tril_indices(n_atom)
+        mats = np.zeros((n_samples, _triangle_size(size)), dtype=np.float16)
+        mats[:, :len(i)] = sq[order[:, i], order[:, j]]
+        yield mats
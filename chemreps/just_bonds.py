@@ -11,75 +11,58 @@ Disclaimers:
     - This is an adaption and may not be a good representation
 '''
 
-import copy
 import glob
 import numpy as np
-from itertools import chain
-from .utils.molecule import Molecule
+from .utils.reader import load_molecule
+from .utils.elements import self_interaction
 from .utils.bag_handler import bag_updater
-from .utils.bag_handler import bag_organizer
-from .utils.calcs import length
+from .utils.bag_handler import bag_layout
+from .utils.bag_codes import bond_bag_codes
+from .utils.calcs import lengths
 
 
-def bonds(mol_file, bags, bag_sizes):
+def bonds(mol_file, bags, bag_sizes, out=None):
     '''
     Parameters
     ---------
-    mol_file: file
-        molecule file for reading in coordinates
+    mol_file: file, Molecule, or tuple
+        molecule file for reading in coordinates, an already parsed
+        Molecule (eg. from chemreps.utils.reader.read_molecules), or an
+        (at_num, xyz, connect) entry of a MoleculeBatch
     bags: dict
         dict of all bags for the dataset
-    bag_sizes: dict
-        dict of size of the largest bags in the dataset
+    bag_sizes: dict or BagLayout
+        dict of size of the largest bags in the dataset or its BagLayout
+    out: array
+        preallocated float16 vector to write the features into (eg. a row
+        of a feature matrix made with BagLayout.zeros)
 
     Returns
     -------
     just_bonds: vector
         vector of just bonds of the molecule
     '''
-    accepted_file_formats = ['sdf', 'mol', 'cml']
-    # copy bags dict to ensure it does not get edited
-    bag_set = copy.deepcopy(bags)
-    current_molecule = Molecule(mol_file)
+    accepted_file_formats = ['sdf', 'mol', 'cml', 'batch']
+    current_molecule = load_molecule(mol_file)
     if current_molecule.ftype not in accepted_file_formats:
         raise NotImplementedError(
-            'file type \'{}\'  is unsupported. Accepted formats: sdf, mol, cml.'.format(current_molecule.ftype))
-    for i in range(current_molecule.n_atom):
-        for j in range(i, current_molecule.n_atom):
-            atomi = current_molecule.sym[i]
-            atomj = current_molecule.sym[j]
-            zi = current_molecule.at_num[i]
-            zj = current_molecule.at_num[j]
+            'file type \'{}\'  is unsupported. Accepted formats: sdf, mol, cml, or MoleculeBatch entries.'.format(current_molecule.ftype))
+    at_num = np.asarray(current_molecule.at_num, dtype=np.int64)
+    # lengths of all bonds in one call
+    connect = np.asarray(current_molecule.connect, dtype=np.int64).reshape(-1, 2) - 1
+    rij = lengths(current_molecule, connect[:, 0], connect[:, 1])
+    # The mij is leftover from the cm/bob style. It may be that in the
+    # future we switch to just taking rij here instead of dividing by
+    # the nuclear charges.
+    mij = (at_num[connect[:, 0]] * at_num[connect[:, 1]]).astype(np.float16) / rij
 
-            if i == j:
-                mii = 0.5 * zi ** 2.4
-                bag_set[atomi].append(mii)
-
-    for i in range(current_molecule.n_connect):
-        a = int(current_molecule.connect[i][0]) - 1
-        b = int(current_molecule.connect[i][1]) - 1
-        a_sym = current_molecule.sym[a]
-        b_sym = current_molecule.sym[b]
-        zi = current_molecule.at_num[a]
-        zj = current_molecule.at_num[b]
-        if b_sym > a_sym:
-            # swap for lexographic order
-            a_sym, b_sym = b_sym, a_sym
-        bond = "{}{}".format(a_sym, b_sym)
-        # rij = sqrt((xi - xj)^2 + (yi - yj)^2 + (zi - zj)^2)
-        rij = length(current_molecule, a, b)
-        # The mij is leftover from the cm/bob style. It may be that in the
-        # future we switch to just taking rij here instead of dividing by
-        # the nuclear charges.
-        mij = (zi * zj) / rij
-
-        bag_set[bond].append(mij)
-
-    # sort bags by magnitude, pad, concactenate
-    just_bonds = bag_organizer(bag_set, bag_sizes)
-
-    # flatten just_bonds into one list and store as a np.array
-    just_bonds = np.array(
-        list(chain.from_iterable(just_bonds)), dtype=np.float16)
+    # self interaction of every atom followed by every bond
+    values = np.concatenate((self_interaction[at_num], mij))
+    codes = bond_bag_codes(current_molecule)
+    # sort bags by magnitude and write them into the output vector
+    layout = bag_layout(bag_sizes)
+    if out is None:
+        out = layout.zeros()
+    just_bonds = layout.scatter(out, codes, values)
 
     return just_bonds
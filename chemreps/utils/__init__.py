@@ -3,10 +3,27 @@ Initializing of utils files for importing into the main representation functions
 '''
 
 from .molecule import Molecule
+from .reader import read_molecules
+from .reader import read_symbols
+from .index import MoleculeIndex
+from .batch import MoleculeBatch
+from .topology import Topology
 from .bag_handler import bag_updater
 from .bag_handler import bag_organizer
+from .bag_handler import BagLayout
+from .bag_handler import migrate_features
+from .bag_codes import key_to_code
+from .bag_codes import decode
 from .calcs import length
+from .calcs import lengths
+from .calcs import distance_matrix
 from .calcs import angle
 from .calcs import torsion
+from .calcs import angles
+from .calcs import torsions
 from .graphs import gen_graph
+from .graphs import gen_csr_graph
+from .graphs import csr_to_sparse
 from .graphs import dfs_connections
+from .graphs import angle_paths
+from .graphs import torsion_paths
@@ -0,0 +1,237 @@
+'''
+Integer codes for bag keys. A bag key of up to four atoms is packed as the
+atomic numbers of its atoms in key order with 7 bits per atom, so 'CH' is
+6*128 + 1. Keys of different lengths never share a code because every atomic
+number is at least 1. Codes can be canonicalized, counted, and sorted with
+NumPy and are only turned back into the human readable keys used by
+bag_sizes (eg. 'CH', 'HCCN') once per bag.
+'''
+import re
+import numpy as np
+from .elements import symbols
+from .elements import symbol_rank
+from .elements import to_z
+from .elements import self_interaction
+
+BASE = 128
+
+
+def encode(at_num):
+    """
+    Packs rows of atomic numbers into bag codes
+
+    Parameters
+    -----------
+    at_num : array
+        atomic numbers of each key in key order. Size: (M,) or (M,k)
+
+    Returns
+    --------
+    codes : array
+        bag code of each row. Size: (M,)
+    """
+    at_num = np.asarray(at_num, dtype=np.int64)
+    if at_num.ndim == 1:
+        return at_num.copy()
+    codes = np.zeros(len(at_num), dtype=np.int64)
+    for col in range(at_num.shape[1]):
+        codes = codes * BASE + at_num[:, col]
+    return codes
+
+
+def decode(codes):
+    """
+    Returns the human readable bag keys of bag codes
+
+    Parameters
+    -----------
+    codes : int or array
+        bag codes
+
+    Returns
+    --------
+    keys : string or list
+        bag key of each code (eg. 'CH')
+    """
+    if np.ndim(codes) == 0:
+        code = int(codes)
+        at_num = []
+        while code > 0:
+            at_num.append(code % BASE)
+            code //= BASE
+        return ''.join(symbols[at_num[::-1]])
+    return [decode(code) for code in codes]
+
+
+def key_to_code(key):
+    """
+    Returns the bag code of a human readable bag key
+
+    Parameters
+    -----------
+    key : string
+        bag key (eg. 'HCCN')
+
+    Returns
+    --------
+    code : int
+        bag code of the key
+    """
+    at_num = to_z(re.findall('[A-Z][a-z]*', key))
+    return int(encode(at_num[np.newaxis, :])[0])
+
+
+def pair_codes(zi, zj):
+    """
+    Bag codes of atom pairs with the larger atomic number first as used by
+    Bag of Bonds and the pairwise part of BAT (eg. 'CH', 'OC')
+
+    Parameters
+    -----------
+    zi, zj : array
+        atomic numbers of each atom of the pairs
+
+    Returns
+    --------
+    codes : array
+        bag code of each pair
+    """
+    zi = np.asarray(zi, dtype=np.int64)
+    zj = np.asarray(zj, dtype=np.int64)
+    return np.maximum(zi, zj) * BASE + np.minimum(zi, zj)
+
+
+def bond_codes(zi, zj):
+    """
+    Bag codes of bonded pairs with the lexographically larger symbol first
+    as used by Just Bonds (eg. 'HC', 'OC')
+
+    Parameters
+    -----------
+    zi, zj : array
+        atomic numbers of each atom of the bonds
+
+    Returns
+    --------
+    codes : array
+        bag code of each bond
+    """
+    zi = np.asarray(zi, dtype=np.int64)
+    zj = np.asarray(zj, dtype=np.int64)
+    swap = symbol_rank[zj] > symbol_rank[zi]
+    return encode(np.stack((np.where(swap, zj, zi),
+                            np.where(swap, zi, zj)), axis=1))
+
+
+def angle_codes(z):
+    """
+    Bag codes of angles with the end atoms in lexographic order (eg. 'CCH')
+
+    Parameters
+    -----------
+    z : array
+        atomic numbers of each angle i-j-k. Size: (M,3)
+
+    Returns
+    --------
+    codes : array
+        bag code of each angle
+    """
+    z = np.array(z, dtype=np.int64).reshape(-1, 3)
+    swap = symbol_rank[z[:, 2]] < symbol_rank[z[:, 0]]
+    z[swap] = z[swap, ::-1]
+    return encode(z)
+
+
+def torsion_codes(z):
+    """
+    Bag codes of torsions reversed if the last atom is lexographically first
+    (eg. 'HCCN')
+
+    Parameters
+    -----------
+    z : array
+        atomic numbers of each torsion i-j-k-l. Size: (M,4)
+
+    Returns
+    --------
+    codes : array
+        bag code of each torsion
+    """
+    z = np.array(z, dtype=np.int64).reshape(-1, 4)
+    swap = symbol_rank[z[:, 3]] < symbol_rank[z[:, 0]]
+    z[swap] = z[swap, ::-1]
+    return encode(z)
+
+
+def count_codes(codes, decoded=True):
+    """
+    Counts how many times each bag code occurs
+
+    Parameters
+    -----------
+    codes : array
+        bag codes of the current molecule
+    decoded : bool
+        key the counts by human readable bag key instead of bag code
+
+    Returns
+    --------
+    bag : dict
+        number of entries in each bag keyed by human readable bag key (or
+        by bag code if not decoded)
+    """
+    unique, counts = np.unique(codes, return_counts=True)
+    keys = decode(unique) if decoded else unique.tolist()
+    return dict(zip(keys, counts.tolist()))
+
+
+def pair_bag_terms(molecule, values=True):
+    """
+    Bag codes and values of every atom and atom pair of a molecule as used by
+    Bag of Bonds and the bonds/nonbonds of BAT. Each atom holds its self
+    interaction and each pair i < j holds Zi*Zj/rij with rij rounded to
+    float16 before dividing as in calcs.length.
+
+    Parameters
+    -----------
+    molecule : Molecule
+        current molecule
+    values : bool
+        also compute the values from the molecule's distance matrix
+
+    Returns
+    --------
+    codes : array
+        bag code of every atom followed by every pair i < j
+    values : array
+        value of every atom and pair in the same order (None if not values)
+    """
+    at_num = np.asarray(molecule.at_num, dtype=np.int64)
+    i, j = np.triu_indices(len(at_num), k=1)
+    codes = np.concatenate((encode(at_num), pair_codes(at_num[i], at_num[j])))
+    if not values:
+        return codes, None
+    rij = molecule.distances[i, j].astype(np.float16)
+    mij = (at_num[i] * at_num[j]).astype(np.float16) / rij
+    return codes, np.concatenate((self_interaction[at_num], mij))
+
+
+def bond_bag_codes(molecule):
+    """
+    Bag codes of every atom and bond of a molecule as used by Just Bonds
+
+    Parameters
+    -----------
+    molecule : Molecule
+        current molecule
+
+    Returns
+    --------
+    codes : array
+        bag code of every atom followed by every bond in connect
+    """
+    at_num = np.asarray(molecule.at_num, dtype=np.int64)
+    connect = np.asarray(molecule.connect, dtype=np.int64).reshape(-1, 2) - 1
+    return np.concatenate((encode(at_num), bond_codes(at_num[connect[:, 0]],
+                                                      at_num[connect[:, 1]])))
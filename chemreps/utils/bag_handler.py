@@ -2,6 +2,9 @@
 Bag handling functions to allow for updating and sorting of bags for the
 various representations
 '''
+import numpy as np
+from .bag_codes import key_to_code
+from .bag_codes import decode
 
 
 def bag_updater(bag, bag_sizes):
@@ -62,3 +65,234 @@ def bag_organizer(bag_set, bag_sizes):
         feat_list.append(bag_set[bag_keys[i]])
 
     return feat_list
+
+
+class BagLayout:
+    """
+    Class to store where each bag is placed in a bagged feature vector so
+    representations can write sorted bags directly into an output array
+
+    Attributes
+    ----------
+    keys : list
+        bag keys in feature order
+    sizes : array
+        size of the largest bag in the dataset for each key
+    offsets : array
+        start of each bag in the feature vector
+    widths : array
+        number of features for each bag (size + 1 as in bag_organizer)
+    n_features : int
+        length of the feature vector
+    codes : array
+        integer bag code of each key
+    """
+
+    def __init__(self, bag_sizes):
+        self.keys = list(bag_sizes.keys())
+        self.sizes = np.array([bag_sizes[key] for key in self.keys],
+                              dtype=np.int64)
+        self.widths = self.sizes + 1
+        self.offsets = np.cumsum(self.widths) - self.widths
+        self.n_features = int(self.widths.sum())
+        self._index = {key: i for i, key in enumerate(self.keys)}
+        self.codes = np.array([key_to_code(key) for key in self.keys],
+                              dtype=np.int64)
+        self._code_order = np.argsort(self.codes)
+        return None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __getitem__(self, key):
+        """
+        Returns the (offset, width) of a bag in the feature vector
+        """
+        i = self._index[key]
+        return int(self.offsets[i]), int(self.widths[i])
+
+    def slots(self, codes):
+        """
+        Returns the bag number of each bag code
+
+        Parameters
+        -----------
+        codes : array
+            integer bag codes
+
+        Returns
+        --------
+        slots : array
+            position of each code's bag in keys
+        """
+        codes = np.asarray(codes, dtype=np.int64)
+        sorted_codes = self.codes[self._code_order]
+        pos = np.searchsorted(sorted_codes, codes)
+        pos = np.minimum(pos, max(len(sorted_codes) - 1, 0))
+        if len(sorted_codes) == 0:
+            missing = np.ones(len(codes), dtype=bool)
+        else:
+            missing = sorted_codes[pos] != codes
+        if np.any(missing):
+            raise KeyError(decode(codes[missing][0]))
+        return self._code_order[pos]
+
+    def zeros(self, n_rows=None, dtype=np.float16):
+        """
+        Allocates an empty feature vector or matrix for this layout
+
+        Parameters
+        -----------
+        n_rows : int
+            number of feature vectors (default: a single vector)
+        dtype : dtype
+            data type of the features
+
+        Returns
+        --------
+        features : array
+            zero array. Size: (n_features,) or (n_rows,n_features)
+        """
+        if n_rows is None:
+            return np.zeros(self.n_features, dtype=dtype)
+        return np.zeros((n_rows, self.n_features), dtype=dtype)
+
+    def scatter(self, row, codes, values):
+        """
+        Groups values by integer bag code, sorts each bag by magnitude with
+        one segmented sort, and writes them into their place in row.
+        Positions past the end of each bag are set to zero.
+
+        Parameters
+        -----------
+        row : array
+            feature vector to fill. Size: (n_features,)
+        codes : array
+            integer bag code of each value
+        values : array
+            values of the current molecule
+
+        Returns
+        --------
+        row : array
+            filled feature vector
+        """
+        values = np.asarray(values)
+        slots = self.slots(codes)
+        # sort by bag, then by decreasing value within each bag
+        order = np.lexsort((-values, slots))
+        slots = slots[order]
+        counts = np.bincount(slots, minlength=len(self))
+        too_small = np.flatnonzero(counts > self.sizes)
+        if len(too_small) > 0:
+            raise Exception(
+                '{}-bag size is too small. Increase size to {}.'.format(self.keys[too_small[0]], counts[too_small[0]]))
+        # position of each value within its bag
+        starts = np.cumsum(counts) - counts
+        pos = np.arange(len(slots)) - starts[slots]
+        row[:] = 0
+        row[self.offsets[slots] + pos] = values[order]
+        return row
+
+
+# compiled layouts keyed by the (key, size) items of their bag sizes
+_layout_cache = {}
+_layout_cache_size = 32
+
+
+def bag_layout(bag_sizes):
+    """
+    Returns bag_sizes as a BagLayout. Layouts of dicts are cached by their
+    keys and sizes so the same bag sizes are only compiled once
+
+    Parameters
+    -----------
+    bag_sizes : dict or BagLayout
+        dictionary of the largest bag sizes in the dataset or its layout
+
+    Returns
+    --------
+    layout : BagLayout
+        layout of the bags
+    """
+    if isinstance(bag_sizes, BagLayout):
+        return bag_sizes
+    # reuse the layout of bag sizes seen before instead of compiling it for
+    # every molecule when the representations are called with a dict
+    key = tuple(bag_sizes.items())
+    layout = _layout_cache.get(key)
+    if layout is None:
+        if len(_layout_cache) >= _layout_cache_size:
+            _layout_cache.clear()
+        layout = BagLayout(bag_sizes)
+        _layout_cache[key] = layout
+    return layout
+
+
+def migrate_features(features, old_layout, new_layout, out=None,
+                     chunk_size=4096):
+    """
+    Re-pads bagged feature vectors made with an old layout to a larger
+    layout (eg. after BagMaker.update) without refeaturizing. Each old bag
+    is block copied to the start of its new bag and the rest of the new
+    vector is zero. Rows are copied in chunks so features and out can be
+    memory-mapped (eg. with np.load(..., mmap_mode='r') and
+    np.lib.format.open_memmap).
+
+    Parameters
+    -----------
+    features : array
+        feature vectors made with old_layout. Size: (n_features,) or
+        (n_rows,n_features)
+    old_layout : dict or BagLayout
+        bag sizes or layout the features were made with
+    new_layout : dict or BagLayout
+        bag sizes or layout to migrate to. Every old bag must be in the new
+        layout and be at least as large
+    out : array
+        preallocated array for the migrated features (default: a new array
+        of the same dtype as features)
+    chunk_size : int
+        number of rows copied at once
+
+    Returns
+    --------
+    out : array
+        feature vectors in the new layout. Size: (new n_features,) or
+        (n_rows,new n_features)
+    """
+    old_layout = bag_layout(old_layout)
+    new_layout = bag_layout(new_layout)
+    if features.shape[-1] != old_layout.n_features:
+        raise ValueError('features have {} columns but the old layout has {}.'.format(
+            features.shape[-1], old_layout.n_features))
+    # block of each old bag in the old and new feature vectors
+    blocks = []
+    for key in old_layout.keys:
+        if key not in new_layout:
+            raise KeyError('{}-bag is not in the new layout.'.format(key))
+        old_offset, old_width = old_layout[key]
+        new_offset, new_width = new_layout[key]
+        if new_width < old_width:
+            raise Exception(
+                '{}-bag size is too small. Increase size to {}.'.format(key, old_width - 1))
+        blocks.append((old_offset, new_offset, old_width))
+
+    if features.ndim == 1:
+        if out is None:
+            out = new_layout.zeros(dtype=features.dtype)
+        migrate_features(features[np.newaxis, :], old_layout, new_layout,
+                         out[np.newaxis, :], chunk_size)
+        return out
+    if out is None:
+        out = new_layout.zeros(len(features), dtype=features.dtype)
+    for start in range(0, len(features), chunk_size):
+        rows = features[start:start+chunk_size]
+        chunk = np.zeros((len(rows), new_layout.n_features), dtype=out.dtype)
+        for old_offset, new_offset, width in blocks:
+            chunk[:, new_offset:new_offset+width] = rows[:, old_offset:old_offset+width]
+        out[start:start+chunk_size] = chunk
+    return out
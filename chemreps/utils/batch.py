@@ -0,0 +1,157 @@
+'''
+Struct-of-arrays container for holding many molecules as flat contiguous
+arrays instead of one Molecule object per molecule.
+'''
+import numpy as np
+from .reader import iter_dataset
+
+
+class MoleculeBatch:
+    """
+    Class to store many molecules as flat arrays with per-molecule offsets.
+    The atoms of molecule k are at_num[atom_offsets[k]:atom_offsets[k+1]]
+    and its bonds are connect[bond_offsets[k]:bond_offsets[k+1]]. Slicing a
+    batch shares the flat arrays and only slices the offsets.
+
+    Attributes
+    ----------
+    at_num : array
+        atomic numbers of all atoms (int8). Size: (total atoms,)
+    xyz : array
+        xyz coordinates of all atoms (float32). Size: (total atoms, 3)
+    connect : array
+        bond connectivity of all molecules (int32). Indices start at 1
+        within each molecule as in Molecule.connect. Size: (total bonds, 2)
+        (None if the batch was built without bonds)
+    atom_offsets : array
+        start of each molecule in at_num and xyz. Size: (n_mol+1,)
+    bond_offsets : array
+        start of each molecule in connect. Size: (n_mol+1,)
+    """
+
+    def __init__(self, at_num, xyz, connect, atom_offsets, bond_offsets):
+        self.at_num = at_num
+        self.xyz = xyz
+        self.connect = connect
+        self.atom_offsets = atom_offsets
+        self.bond_offsets = bond_offsets
+        return None
+
+    @classmethod
+    def from_molecules(cls, molecules, bonds=True):
+        """
+        Builds a batch from an iterable of Molecules
+
+        Parameters
+        ----------
+        molecules : iterable
+            Molecule objects
+        bonds : bool
+            store the bonds of each molecule. Bonds of xyz and cclib
+            molecules are perceived from covalent radii to do this, so
+            pipelines that only need coordinates (eg. coulomb_matrices)
+            should use False
+
+        Returns
+        -------
+        batch : MoleculeBatch
+            batch of all the molecules
+        """
+        at_num = []
+        xyz = []
+        connect = []
+        n_atoms = [0]
+        n_bonds = [0]
+        for molecule in molecules:
+            at_num.append(np.asarray(molecule.at_num, dtype=np.int8))
+            xyz.append(np.asarray(molecule.xyz, dtype=np.float32).reshape(-1, 3))
+            n_atoms.append(molecule.n_atom)
+            if bonds:
+                connect.append(np.asarray(molecule.connect, dtype=np.int32).reshape(-1, 2))
+                n_bonds.append(len(connect[-1]))
+            else:
+                n_bonds.append(0)
+        if len(at_num) == 0:
+            at_num = [np.zeros(0, dtype=np.int8)]
+            xyz = [np.zeros((0, 3), dtype=np.float32)]
+        if len(connect) == 0:
+            connect = [np.zeros((0, 2), dtype=np.int32)]
+        return cls(np.concatenate(at_num), np.concatenate(xyz),
+                   np.concatenate(connect) if bonds else None,
+                   np.cumsum(n_atoms), np.cumsum(n_bonds))
+
+    @classmethod
+    def from_dataset(cls, dataset, bonds=True):
+        """
+        Builds a batch from a dataset using the existing parsers
+
+        Parameters
+        ----------
+        dataset : path or iterable
+            directory of molecule files, a multi-record sdf/xyz file, or an
+            iterable of molecule files and/or Molecules
+        bonds : bool
+            store the bonds of each molecule (see from_molecules)
+
+        Returns
+        -------
+        batch : MoleculeBatch
+            batch of all the molecules in the dataset
+        """
+        return cls.from_molecules(iter_dataset(dataset), bonds)
+
+    @property
+    def n_atoms(self):
+        """
+        Number of atoms in each molecule
+        """
+        return np.diff(self.atom_offsets)
+
+    @property
+    def n_bonds(self):
+        """
+        Number of bonds in each molecule
+        """
+        return np.diff(self.bond_offsets)
+
+    def __len__(self):
+        return len(self.atom_offsets) - 1
+
+    def __getitem__(self, k):
+        """
+        Returns the arrays of molecule k or a batch of a slice of molecules
+
+        Parameters
+        ----------
+        k : int or slice
+            molecule number or contiguous slice of molecules
+
+        Returns
+        -------
+        arrays : tuple or MoleculeBatch
+            (at_num, xyz, connect) views for an int or a MoleculeBatch
+            sharing the same flat arrays for a slice. connect is None if
+            the batch was built without bonds. The tuples can be passed to
+            the representations and BagMaker like Molecules
+        """
+        if isinstance(k, slice):
+            start, stop, step = k.indices(len(self))
+            if step != 1:
+                raise IndexError('MoleculeBatch slices must be contiguous.')
+            stop = max(start, stop)
+            return MoleculeBatch(self.at_num, self.xyz, self.connect,
+                                 self.atom_offsets[start:stop+1],
+                                 self.bond_offsets[start:stop+1])
+        if k < 0:
+            k += len(self)
+        if not 0 <= k < len(self):
+            raise IndexError('molecule {} is out of range.'.format(k))
+        a0, a1 = self.atom_offsets[k], self.atom_offsets[k+1]
+        b0, b1 = self.bond_offsets[k], self.bond_offsets[k+1]
+        if self.connect is None:
+            return self.at_num[a0:a1], self.xyz[a0:a1], None
+        return self.at_num[a0:a1], self.xyz[a0:a1], self.connect[b0:b1]
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self[k]
@@ -33,6 +33,50 @@ def length(molecule, atomi, atomj):
     return np.float16(rij)
 
 
+def distance_matrix(xyz):
+    """
+    Returns the lengths between all pairs of atoms
+
+    Parameters
+    -----------
+    xyz : array
+        xyz coordinates. Size: (n_atom,3)
+
+    Returns
+    --------
+    r : array
+        distance matrix. Size: (n_atom,n_atom)
+    """
+    xyz = np.asarray(xyz, dtype=np.float64)
+    d = xyz[:, np.newaxis, :] - xyz[np.newaxis, :, :]
+    r = np.sqrt((d[..., 0] ** 2) + (d[..., 1] ** 2) + (d[..., 2] ** 2))
+    return r
+
+
+def lengths(molecule, atomi, atomj):
+    """
+    Returns the lengths between many pairs of atoms at once
+
+    Parameters
+    -----------
+    molecule : object
+        molecule object
+    atomi, atomj : array
+        atoms of each pair
+
+    Returns
+    --------
+    rij : array
+        length between each pair
+    """
+    atomi = np.asarray(atomi, dtype=np.int64)
+    atomj = np.asarray(atomj, dtype=np.int64)
+    d = np.asarray(molecule.xyz, dtype=np.float64)[atomi] - \
+        np.asarray(molecule.xyz, dtype=np.float64)[atomj]
+    rij = np.sqrt((d[..., 0] ** 2) + (d[..., 1] ** 2) + (d[..., 2] ** 2))
+    return rij.astype(np.float16)
+
+
 def uvec(i, a, b):
     """
     Returns the unit vector between two atoms
@@ -132,3 +176,63 @@ def torsion(molecule, atomi, atomj, atomk, atoml):
     dihedral = (x + y + z) / (sin(ang(a, b, c)) * sin(ang(b, c, d)))
     dihedral = acos(dihedral)
     return np.abs(dihedral)
+
+
+def angles(xyz, idx):
+    """
+    Returns the angles of many triples of atoms at once. Angles are computed
+    with atan2 so near linear geometries are numerically stable.
+
+    Parameters
+    -----------
+    xyz : array
+        xyz coordinates. Size: (n_atom,3)
+    idx : array
+        atom indices (starting at 0) of each angle i-j-k. Size: (M,3)
+
+    Returns
+    --------
+    theta : array
+        angles in radians. Size: (M,)
+    """
+    xyz = np.asarray(xyz, dtype=np.float64)
+    idx = np.asarray(idx, dtype=np.int64).reshape(-1, 3)
+    u = xyz[idx[:, 0]] - xyz[idx[:, 1]]
+    v = xyz[idx[:, 2]] - xyz[idx[:, 1]]
+    sin_theta = np.linalg.norm(np.cross(u, v), axis=1)
+    cos_theta = np.einsum('ij,ij->i', u, v)
+    theta = np.arctan2(sin_theta, cos_theta)
+    return theta
+
+
+def torsions(xyz, idx):
+    """
+    Returns the dihedral angles of many quadruples of atoms at once. The
+    dihedrals are unsigned like torsion and are computed with atan2 so
+    near linear geometries are numerically stable.
+
+    Parameters
+    -----------
+    xyz : array
+        xyz coordinates. Size: (n_atom,3)
+    idx : array
+        atom indices (starting at 0) of each torsion i-j-k-l. Size: (M,4)
+
+    Returns
+    --------
+    dihedral : array
+        dihedral angles in radians. Size: (M,)
+    """
+    xyz = np.asarray(xyz, dtype=np.float64)
+    idx = np.asarray(idx, dtype=np.int64).reshape(-1, 4)
+    b1 = xyz[idx[:, 1]] - xyz[idx[:, 0]]
+    b2 = xyz[idx[:, 2]] - xyz[idx[:, 1]]
+    b3 = xyz[idx[:, 3]] - xyz[idx[:, 2]]
+    # normals of the two planes and the frame vector orthogonal to n1, b2
+    n1 = np.cross(b1, b2)
+    n2 = np.cross(b2, b3)
+    m1 = np.cross(n1, b2 / np.linalg.norm(b2, axis=1)[:, np.newaxis])
+    x = np.einsum('ij,ij->i', n1, n2)
+    y = np.einsum('ij,ij->i', m1, n2)
+    dihedral = np.abs(np.arctan2(y, x))
+    return dihedral
@@ -0,0 +1,79 @@
+'''
+Element registry built once at import from QCElemental. The arrays are indexed
+by atomic number so parsers and representations can look up properties of
+every atom in a molecule with NumPy fancy indexing instead of calling
+QCElemental once per atom or per pair.
+'''
+import numpy as np
+import qcelemental as qcel
+
+# atomic symbol for each atomic number (index 0 is a dummy atom)
+symbols = np.array(qcel.periodictable.E)
+
+# map of atomic symbol to atomic number
+symbol_to_z = {sym: z for z, sym in enumerate(qcel.periodictable.E) if z > 0}
+
+
+def _covalent_radius(sym):
+    try:
+        return qcel.covalentradii.get(sym, units='angstrom')
+    except:
+        return np.nan
+
+
+# covalent radii in angstrom for each atomic number (nan if not defined)
+covalent_radii = np.array([np.nan] + [_covalent_radius(sym)
+                                      for sym in qcel.periodictable.E[1:]])
+
+# rank of each atomic symbol in lexographic order so symbols can be compared
+# as integers (eg. symbol_rank[6] < symbol_rank[1] since 'C' < 'H')
+symbol_rank = np.argsort(np.argsort(symbols, kind='stable'), kind='stable')
+
+# coulomb self interaction term 0.5 * Z^2.4 for each atomic number
+self_interaction = np.array([0.5 * z ** 2.4 for z in range(len(symbols))])
+
+
+def to_z(sym):
+    """
+    Returns the atomic numbers for a list of chemical symbols
+
+    Parameters
+    -----------
+    sym : list
+        chemical symbols
+
+    Returns
+    --------
+    at_num : array
+        atomic numbers for each symbol
+    """
+    # look up each distinct symbol once and map back to every atom
+    unique, inverse = np.unique(np.asarray(sym, dtype=str), return_inverse=True)
+    unique_z = np.empty(len(unique), dtype=np.int64)
+    for i, s in enumerate(unique.tolist()):
+        try:
+            unique_z[i] = symbol_to_z[s]
+        except KeyError:
+            # fall back to qcelemental for other labels (eg. 'D' or 'c')
+            try:
+                unique_z[i] = qcel.periodictable.to_Z(s)
+            except:
+                raise KeyError('{} is not defined.'.format(s))
+    return unique_z[inverse.reshape(-1)]
+
+
+def to_symbol(at_num):
+    """
+    Returns the chemical symbols for an array of atomic numbers
+
+    Parameters
+    -----------
+    at_num : array
+        atomic numbers
+
+    Returns
+    --------
+    sym : list
+        chemical symbols for each atomic number
+    """
+    return symbols[np.asarray(at_num, dtype=np.int64)].tolist()
@@ -1,6 +1,60 @@
 """
 Graph based functions for angles and torsions
 """
+import numpy as np
+from scipy.sparse import csr_matrix
+
+
+def gen_csr_graph(connect, n_atom):
+    '''
+    Generates a compressed sparse row (CSR) adjacency of the connectivity in
+    one pass over the bonds. The neighbors of atom i (starting at 0) are
+    indices[indptr[i]:indptr[i+1]] in the order their bonds appear in connect.
+
+    Parameters
+    ---------
+    connect: list
+        list of bond connectivity (starting at 1)
+    n_atom : int
+        number of atoms
+
+    Returns
+    -------
+    indptr: array
+        start of each atom's neighbors in indices. Size: (n_atom+1,)
+    indices: array
+        neighbors of all atoms (starting at 0). Size: (2*n_bonds,)
+    '''
+    connect = np.asarray(connect, dtype=np.int64).reshape(-1, 2) - 1
+    # both directions of every bond, kept in bond order by the stable sort
+    src = connect.ravel()
+    dst = connect[:, ::-1].ravel()
+    order = np.argsort(src, kind='stable')
+    indices = dst[order].astype(np.int32)
+    indptr = np.zeros(n_atom + 1, dtype=np.int32)
+    np.cumsum(np.bincount(src, minlength=n_atom), out=indptr[1:])
+    return indptr, indices
+
+
+def csr_to_sparse(indptr, indices):
+    '''
+    Converts a CSR adjacency to a scipy.sparse matrix
+
+    Parameters
+    ---------
+    indptr: array
+        start of each atom's neighbors in indices
+    indices: array
+        neighbors of all atoms (starting at 0)
+
+    Returns
+    -------
+    adjacency: scipy.sparse.csr_matrix
+        adjacency matrix of the molecule. Size: (n_atom,n_atom)
+    '''
+    n_atom = len(indptr) - 1
+    data = np.ones(len(indices), dtype=np.int8)
+    return csr_matrix((data, indices, indptr), shape=(n_atom, n_atom))
 
 
 def gen_graph(connect, n_atom):
@@ -19,20 +73,106 @@ def gen_graph(connect, n_atom):
     graph: dict
         graph of entire system
     '''
+    indptr, indices = gen_csr_graph(connect, n_atom)
+    # graph keys and neighbors start at 1 like connect
+    neighbors = (indices + 1).tolist()
     graph = {}
-    for atom in range(1, n_atom+1):
-        aconn = []
-        for conn in connect:
-            if atom in conn:
-                c = list(conn)
-                c.remove(float(atom))
-                aconn.append(int(c[0]))
-        graph.update({atom: aconn})
+    for atom in range(n_atom):
+        graph.update({atom + 1: neighbors[indptr[atom]:indptr[atom+1]]})
 
     return graph
 
 
-def dfs_connections(graph, start, length, connections, connection=[]):
+def _ragged_arange(counts):
+    '''
+    Concatenation of arange(c) for every c in counts
+    '''
+    counts = np.asarray(counts, dtype=np.int64)
+    starts = np.cumsum(counts) - counts
+    return np.arange(counts.sum()) - np.repeat(starts, counts)
+
+
+def angle_paths(indptr, indices):
+    '''
+    Enumerates every angle i-j-k once from each center's neighbor pairs.
+    Angles are oriented so that i < k, the same orientation dfs_connections
+    keeps.
+
+    Parameters
+    ---------
+    indptr: array
+        start of each atom's neighbors in indices (from gen_csr_graph)
+    indices: array
+        neighbors of all atoms (starting at 0)
+
+    Returns
+    -------
+    angles: array
+        atom indices (starting at 0) of all angles. Size: (n_angles,3)
+    '''
+    indptr = np.asarray(indptr, dtype=np.int64)
+    indices = np.asarray(indices, dtype=np.int64)
+    n_atom = len(indptr) - 1
+    center = np.repeat(np.arange(n_atom), np.diff(indptr))
+    pos = np.arange(len(indices))
+    # pair each neighbor with the neighbors after it in the same row
+    counts = indptr[center + 1] - pos - 1
+    first = np.repeat(pos, counts)
+    second = np.repeat(pos + 1, counts) + _ragged_arange(counts)
+    i = indices[first]
+    j = center[first]
+    k = indices[second]
+    keep = i != k
+    i, j, k = i[keep], j[keep], k[keep]
+    swap = i > k
+    i[swap], k[swap] = k[swap], i[swap]
+    return np.stack((i, j, k), axis=1).astype(np.int32)
+
+
+def torsion_paths(indptr, indices):
+    '''
+    Enumerates every torsion i-j-k-l once from each bond j-k and the
+    neighbor sets of j and k. Torsions are oriented so that i < l, the same
+    orientation dfs_connections keeps.
+
+    Parameters
+    ---------
+    indptr: array
+        start of each atom's neighbors in indices (from gen_csr_graph)
+    indices: array
+        neighbors of all atoms (starting at 0)
+
+    Returns
+    -------
+    torsions: array
+        atom indices (starting at 0) of all torsions. Size: (n_torsions,4)
+    '''
+    indptr = np.asarray(indptr, dtype=np.int64)
+    indices = np.asarray(indices, dtype=np.int64)
+    n_atom = len(indptr) - 1
+    deg = np.diff(indptr)
+    src = np.repeat(np.arange(n_atom), deg)
+    # each bond once as the central bond j-k
+    bond = src < indices
+    j = src[bond]
+    k = indices[bond]
+    # every neighbor of j with every neighbor of k
+    counts = deg[j] * deg[k]
+    b = np.repeat(np.arange(len(j)), counts)
+    t = _ragged_arange(counts)
+    j = j[b]
+    k = k[b]
+    i = indices[indptr[j] + t // deg[k]]
+    l = indices[indptr[k] + t % deg[k]]
+    keep = (i != k) & (l != j) & (i != l)
+    i, j, k, l = i[keep], j[keep], k[keep], l[keep]
+    swap = i > l
+    i[swap], l[swap] = l[swap], i[swap]
+    j[swap], k[swap] = k[swap], j[swap]
+    return np.stack((i, j, k, l), axis=1).astype(np.int32)
+
+
+def dfs_connections(graph, start, length, connections, connection=None):
     '''
     Searches for all connected atoms in an angle or torsion using a depth first search
     Adapted from:
@@ -53,6 +193,8 @@ def dfs_connections(graph, start, length, connections, connection=[]):
 
     '''
     # start or append connection list
+    if connection is None:
+        connection = []
     connection = connection + [start]
     # check for desired length
     if len(connection) == length:
@@ -0,0 +1,205 @@
+'''
+Byte offset index for random access into large multi-record sdf and xyz
+files. The index is built with one pass over the file and saved next to it
+so that any record can later be read through a memory map without reading
+the records before it.
+'''
+import os
+import mmap
+import numpy as np
+from .molecule import Molecule
+
+
+class MoleculeIndex:
+    """
+    Class to index and randomly access the records of a multi-record file
+
+    Attributes
+    ----------
+    fname : string
+        multi-record sdf, mol, or xyz file
+    ftype : string
+        file type of fname ('sdf' or 'xyz')
+    index_file : string
+        sidecar index file (default: fname + '.idx.npz')
+    starts : array
+        byte offset of the start of each record. Size: (n_records,)
+    ends : array
+        byte offset of the end of each record. Size: (n_records,)
+    n_atoms : array
+        number of atoms in each record. Size: (n_records,)
+    """
+    __accepted_file_formats = ['xyz', 'sdf', 'mol']
+
+    def __init__(self, fname, index_file=None, rebuild=False):
+        filetype = os.path.splitext(fname)[1].split('.')[-1]
+        if filetype not in MoleculeIndex.__accepted_file_formats:
+            raise NotImplementedError(
+                'file type \'{}\'  is unsupported. Accepted formats: {}.'.format(filetype, MoleculeIndex.__accepted_file_formats))
+        self.fname = fname
+        self.ftype = 'xyz' if filetype == 'xyz' else 'sdf'
+        if index_file is None:
+            index_file = '{}.idx.npz'.format(fname)
+        self.index_file = index_file
+        self._mmap = None
+
+        # only rebuild the index if it is missing or older than the file
+        if (not rebuild and os.path.exists(index_file)
+                and os.path.getmtime(index_file) >= os.path.getmtime(fname)):
+            self.load(index_file)
+        else:
+            self.build()
+            self.save(index_file)
+
+    def build(self):
+        """
+        Scans the file once and records the byte offsets and atom count of
+        every record
+        """
+        starts = []
+        ends = []
+        n_atoms = []
+        with open(self.fname, 'rb') as f:
+            pos = 0
+            if self.ftype == 'xyz':
+                for line in f:
+                    start = pos
+                    pos += len(line)
+                    # skip blank lines between frames
+                    if not line.strip():
+                        continue
+                    n_atom = int(line.split()[0])
+                    try:
+                        for i in range(n_atom + 1):
+                            pos += len(next(f))
+                    except StopIteration:
+                        raise ValueError('{} frame {} is truncated. Expected {} atoms but found {}.'.format(
+                            self.fname, len(starts), n_atom, max(i - 1, 0)))
+                    starts.append(start)
+                    ends.append(pos)
+                    n_atoms.append(n_atom)
+            else:
+                start = 0
+                n_line = 0
+                n_atom = 0
+                blank = True
+                for line in f:
+                    if line.startswith(b'$$$$'):
+                        if not blank:
+                            starts.append(start)
+                            ends.append(pos)
+                            n_atoms.append(n_atom)
+                        pos += len(line)
+                        start = pos
+                        n_line = 0
+                        blank = True
+                        continue
+                    # the counts line is the fourth line of each record
+                    if n_line == 3:
+                        n_atom = int(line.split()[0])
+                    if line.strip():
+                        blank = False
+                    n_line += 1
+                    pos += len(line)
+                # last record may not be terminated by '$$$$'
+                if not blank:
+                    starts.append(start)
+                    ends.append(pos)
+                    n_atoms.append(n_atom)
+        self.starts = np.array(starts, dtype=np.int64)
+        self.ends = np.array(ends, dtype=np.int64)
+        self.n_atoms = np.array(n_atoms, dtype=np.int32)
+
+    def save(self, index_file=None):
+        """
+        Saves the index arrays to the sidecar index file
+
+        Parameters
+        ----------
+        index_file : string
+            index file to write (default: self.index_file)
+        """
+        if index_file is None:
+            index_file = self.index_file
+        # np.savez needs a file object to keep the name as given
+        with open(index_file, 'wb') as f:
+            np.savez(f, starts=self.starts, ends=self.ends,
+                     n_atoms=self.n_atoms)
+
+    def load(self, index_file=None):
+        """
+        Loads the index arrays from the sidecar index file
+
+        Parameters
+        ----------
+        index_file : string
+            index file to read (default: self.index_file)
+        """
+        if index_file is None:
+            index_file = self.index_file
+        with np.load(index_file) as data:
+            self.starts = data['starts']
+            self.ends = data['ends']
+            self.n_atoms = data['n_atoms']
+
+    def __len__(self):
+        return len(self.starts)
+
+    def record(self, k):
+        """
+        Returns the lines of record k read through the memory map
+
+        Parameters
+        ----------
+        k : int
+            record number
+
+        Returns
+        -------
+        lines : list
+            lines of the record
+        """
+        if self._mmap is None:
+            with open(self.fname, 'rb') as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        data = self._mmap[self.starts[k]:self.ends[k]]
+        return data.decode().splitlines(True)
+
+    def __getitem__(self, k):
+        """
+        Returns record k as a Molecule
+
+        Parameters
+        ----------
+        k : int
+            record number
+
+        Returns
+        -------
+        molecule : Molecule
+            parsed molecule of record k
+        """
+        molecule = Molecule()
+        if self.ftype == 'xyz':
+            molecule.parse_xyz(self.record(k))
+        else:
+            molecule.parse_sdf(self.record(k))
+        return molecule
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self[k]
+
+    def close(self):
+        """
+        Closes the memory map of the file
+        """
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __getstate__(self):
+        # memory maps can not be pickled, each process maps the file itself
+        state = self.__dict__.copy()
+        state['_mmap'] = None
+        return state
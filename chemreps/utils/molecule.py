@@ -4,7 +4,10 @@ Molecule class for parsing molecule information from various chemical filetypes.
 import numpy as np
 import cclib
 import os
-import qcelemental as qcel
+from scipy.spatial import cKDTree
+from . import elements
+from .calcs import distance_matrix
+from .topology import Topology
 
 
 class Molecule:
@@ -20,21 +23,156 @@ class Molecule:
     sym :  list
         list of atomic symbol. Size: (n_atom,1)
     at_num : list
-        list of atomic numbers. Size: (n_atom,1)
+        list of atomic numbers (an array for MoleculeBatch entries).
+        Size: (n_atom,1)
     n_connect : int
-        number of bonds (not for xyz)
+        number of bonds (perceived on first access for xyz and cclib)
     connect : list
         list of bond connectivity from file (Note: index starts at 1 from file
         so need to subtract 1 from connectivity when converting to atomic
-        symbol). Size: (n_atom,2) (not for xyz)
+        symbol). Size: (n_atom,2) (perceived from covalent radii on first
+        access for xyz and cclib)
+    distances : array
+        pairwise distance matrix computed and cached on first access.
+        Size: (n_atom,n_atom)
+    topology : Topology
+        graph, angles, torsions, and their bag keys computed and cached on
+        first access
+    kdtree_threshold : int
+        number of atoms above which bonds are perceived with a cKDTree
+        neighbor search instead of checking all pairs
+
+    Notes
+    -----
+    Assigning xyz, at_num, or sym resets the cached distances, topology,
+    and perceived bonds (bonds read from a file are kept). Changing these
+    arrays in place does not, so assign a new array instead.
     """
     __accepted_file_formats = ['xyz', 'sdf', 'mol', 'cml']
+    kdtree_threshold = 1000
+    _connect = None
+    _n_connect = None
+    _distances = None
+    _topology = None
+    _perceived = False
+    _sym = None
 
     def __init__(self, fname=None):
         if fname is not None:
             self.import_file(fname)
         return None
 
+    def _clear_cache(self, bonds=False):
+        # reset data derived from the atoms so it is recomputed. Perceived
+        # bonds are always reset, bonds read from a file only if bonds
+        self._distances = None
+        self._topology = None
+        if bonds or self._perceived:
+            self._connect = None
+            self._n_connect = None
+            self._perceived = False
+
+    @property
+    def xyz(self):
+        return self._xyz
+
+    @xyz.setter
+    def xyz(self, xyz):
+        self._xyz = xyz
+        self._clear_cache()
+
+    @property
+    def at_num(self):
+        return self._at_num
+
+    @at_num.setter
+    def at_num(self, at_num):
+        self._at_num = at_num
+        self._clear_cache()
+
+    @property
+    def sym(self):
+        if self._sym is None:
+            # symbols of molecules built from arrays are made when read
+            self._sym = elements.to_symbol(self.at_num)
+        return self._sym
+
+    @sym.setter
+    def sym(self, sym):
+        self._sym = sym
+        self._clear_cache()
+
+    @property
+    def connect(self):
+        if self._connect is None:
+            self.connectivity_matrix()
+        return self._connect
+
+    @connect.setter
+    def connect(self, connect):
+        self._connect = connect
+        self._perceived = False
+
+    @property
+    def n_connect(self):
+        if self._n_connect is None:
+            return len(self.connect)
+        return self._n_connect
+
+    @n_connect.setter
+    def n_connect(self, n_connect):
+        self._n_connect = n_connect
+
+    @property
+    def distances(self):
+        if self._distances is None:
+            self._distances = distance_matrix(self.xyz)
+        return self._distances
+
+    @property
+    def topology(self):
+        if self._topology is None:
+            self._topology = Topology(self)
+        return self._topology
+
+    @topology.setter
+    def topology(self, topology):
+        self._topology = topology
+
+    @classmethod
+    def from_arrays(cls, at_num, xyz, connect=None):
+        """
+        Builds a Molecule from arrays without parsing a file (eg. an entry
+        of a MoleculeBatch). The arrays are kept as they are (eg. as views
+        of the batch's int8 at_num and float32 xyz) instead of being copied
+        into lists, and sym is only made on first access. The calculations
+        convert them to int64 and float64 themselves.
+
+        Parameters
+        ----------
+        at_num : array
+            atomic numbers. Size: (n_atom,)
+        xyz : array
+            xyz coordinates. Size: (n_atom,3)
+        connect : array
+            bond connectivity starting at 1. If None bonds are perceived
+            from covalent radii on first access
+
+        Returns
+        -------
+        molecule : Molecule
+            molecule with ftype 'batch'
+        """
+        molecule = cls()
+        molecule.ftype = 'batch'
+        # nothing is cached yet so the setters' cache resets are skipped
+        molecule._at_num = np.asarray(at_num)
+        molecule._xyz = np.asarray(xyz).reshape(-1, 3)
+        molecule.n_atom = len(molecule._at_num)
+        if connect is not None:
+            molecule._connect = np.asarray(connect).reshape(-1, 2)
+        return molecule
+
     def sym2num(self, sym):
         """
         Given a chemical symbol, returns the atomic number defined within the class
@@ -49,13 +187,10 @@ class Molecule:
         at_num : int
             atomic number for symbol argument
         """
-        try:
-            atomic_number = qcel.periodictable.to_Z(sym)
-            return atomic_number
-        except:
-            raise KeyError('{} is not defined.'.format(sym))
+        return int(elements.to_z([sym])[0])
 
     def import_file(self, fname):
+        self.fname = fname
         filetype = os.path.splitext(fname)[1].split('.')[1]
         if filetype not in Molecule.__accepted_file_formats:
             parsed_properly = self.import_cclib(fname)
@@ -80,23 +215,33 @@ class Molecule:
         fname : string
             xyz filename
         """
-        self.ftype = 'xyz'
         with open(fname) as f:
             lines = f.readlines()
+        self.parse_xyz(lines)
+
+    def parse_xyz(self, lines):
+        """
+        Fills the Molecule from the lines of a single xyz record
+
+        Parameters
+        ----------
+        lines : list
+            lines of one xyz frame (atom count, comment, atoms)
+        """
+        self._clear_cache(bonds=True)
+        self.ftype = 'xyz'
         self.n_atom = int(lines[0].split()[0])
 
         # reading lines to build up class data
         self.sym = []
-        self.at_num = []
         self.xyz = np.zeros((self.n_atom, 3))
-        for i, line in enumerate(lines[2:]):
+        for i, line in enumerate(lines[2:2+self.n_atom]):
             tmp = line.split()
             self.sym.append(tmp[0])
-            self.at_num.append(self.sym2num(tmp[0]))
             self.xyz[i, 0] = float(tmp[1])
             self.xyz[i, 1] = float(tmp[2])
             self.xyz[i, 2] = float(tmp[3])
-        self.connectivity_matrix()
+        self.at_num = elements.to_z(self.sym).tolist()
 
     def import_sdf(self, fname):
         """
@@ -107,21 +252,32 @@ class Molecule:
         fname : string
             sdf or mol file name
         """
-        self.ftype = 'sdf'
         with open(fname) as f:
             lines = f.readlines()
+        self.parse_sdf(lines)
+
+    def parse_sdf(self, lines):
+        """
+        Fills the Molecule from the lines of a single sdf/mol record
+
+        Parameters
+        ----------
+        lines : list
+            lines of one sdf record (header, counts, atom and bond blocks)
+        """
+        self._clear_cache(bonds=True)
+        self.ftype = 'sdf'
         self.n_atom = int(lines[3].split()[0])
         self.n_connect = int(lines[3].split()[1])
         self.sym = []
-        self.at_num = []
         self.xyz = np.zeros((self.n_atom, 3))
         for i, line in enumerate(lines[4:4+self.n_atom]):
             tmp = line.split()
             self.sym.append(tmp[3])
-            self.at_num.append(self.sym2num(tmp[3]))
             self.xyz[i, 0] = float(tmp[0])
             self.xyz[i, 1] = float(tmp[1])
             self.xyz[i, 2] = float(tmp[2])
+        self.at_num = elements.to_z(self.sym).tolist()
         self.connect = np.zeros((self.n_connect, 2))
         for i, line in enumerate(lines[4+self.n_atom:4+self.n_atom+self.n_connect]):
             tmp = line.split()
@@ -137,13 +293,13 @@ class Molecule:
         fname : string
             cml file name
         """
+        self._clear_cache(bonds=True)
         self.ftype = 'cml'
         with open(fname) as f:
             lines = f.readlines()
         self.n_atom = 0
         self.n_connect = 0
         self.sym = []
-        self.at_num = []
         self.xyz = []
         self.connect = []
         for i in range(len(lines)):
@@ -151,7 +307,6 @@ class Molecule:
                 self.n_atom += 1
                 tmp = lines[i].split()
                 self.sym.append(tmp[2].split('"')[1])
-                self.at_num.append(self.sym2num(tmp[2].split('"')[1]))
                 x = float(tmp[3].split('"')[1])
                 y = float(tmp[4].split('"')[1])
                 z = float(tmp[5].split('"')[1])
@@ -163,6 +318,7 @@ class Molecule:
                 b = int(tmp[2].split('"')[0].split('a')[1])
                 self.connect.append([a, b])
         self.xyz = np.array(self.xyz)
+        self.at_num = elements.to_z(self.sym).tolist()
 
     def import_cclib(self, fname):
         """
@@ -174,19 +330,13 @@ class Molecule:
             cclib parsable output file name
         """
         try:
+            self._clear_cache(bonds=True)
             self.ftype = 'cclib'
             data = cclib.io.ccread(fname)
             self.n_atom = data.natom
-            self.at_num = data.atomnos
-            # This gets the atomic symbols by looking up the keys of the
-            # atomic numbers. It looks somewhat crazy but it is looking
-            # through a list of the values stored in the dictionary,
-            # matching the value to the atomic number and returning
-            # the key that corresponds to that atomic number. It works
-            # with this dictionary because the keys to values are 1 to 1.
-            self.sym = []
-            for i in data.atomnos:
-                self.sym.append(qcel.periodictable.to_E(i))
+            self.at_num = data.atomnos.tolist()
+            # look up all of the atomic symbols at once in the registry
+            self.sym = elements.to_symbol(data.atomnos)
             # cclib stores the atomic coordinates in a array of shape
             # [molecule, num atoms, 3 for xyz] because I think they might
             # have many "molecules" from each step of an optimization or
@@ -213,29 +363,57 @@ class Molecule:
         boolean
             1 if bond exists 0 else
         """
-        i_covr = qcel.covalentradii.get(self.sym[i], units='angstrom')
-        j_covr = qcel.covalentradii.get(self.sym[j], units='angstrom')
+        i_covr = elements.covalent_radii[self.at_num[i]]
+        j_covr = elements.covalent_radii[self.at_num[j]]
         r = np.linalg.norm(self.xyz[i] - self.xyz[j])
         if r < 1.1*(i_covr + j_covr):
             return int(1)
         return int(0)
 
-    def connectivity_matrix(self):
+    def connectivity_matrix(self, kdtree_threshold=None):
         """
         Constructs list of bonded atoms which corresponds to non-zero elements of the upper triangle of the connectivity matrix. Bonds are determined with covalent radii. To access elements of self.connect[i,j], ensure that i < j. 
-       
+
+        All pairwise distances and covalent radii sums are computed at once
+        and the same 1.1 tolerance used in Molecule.bond is applied to the
+        whole upper triangle. For molecules larger than kdtree_threshold,
+        only pairs within the largest possible bond length are found with a
+        cKDTree so that bond perception scales roughly linearly.
+
         Parameters
         ----------
-        None
+        kdtree_threshold : int
+            number of atoms above which the cKDTree search is used
+            (default: Molecule.kdtree_threshold)
 
         Returns
         -------
         None
         """
-        # TODO: make this more memory efficient by ordering i,j in code when needed.
-        temp = []
-        for i in range(self.n_atom):
-            for j in range(i+1, self.n_atom):
-                if self.bond(i, j):
-                    temp.append([i+1, j+1])
-        self.connect = np.asarray(temp)
+        if kdtree_threshold is None:
+            kdtree_threshold = self.kdtree_threshold
+        # look up all covalent radii at once from the element registry
+        covr = elements.covalent_radii[np.asarray(self.at_num)]
+        xyz = np.asarray(self.xyz, dtype=np.float64)
+
+        if self.n_atom > kdtree_threshold:
+            # only pairs closer than the largest covalent cutoff can bond
+            cutoff = 1.1 * 2 * covr.max()
+            pairs = cKDTree(xyz).query_pairs(cutoff, output_type='ndarray')
+            # order pairs the same way as the upper triangle
+            order = np.lexsort((pairs[:, 1], pairs[:, 0]))
+            i = pairs[order, 0]
+            j = pairs[order, 1]
+        else:
+            # upper triangle pairs (i < j) in the same order as the pair loop
+            i, j = np.triu_indices(self.n_atom, k=1)
+        if self._distances is not None or self.n_atom <= kdtree_threshold:
+            r = self.distances[i, j]
+        else:
+            d = xyz[i] - xyz[j]
+            r = np.sqrt(d[:, 0] ** 2 + d[:, 1] ** 2 + d[:, 2] ** 2)
+        bonded = r < 1.1 * (covr[i] + covr[j])
+
+        # connectivity indices start at 1 to match the file formats
+        self.connect = np.stack((i[bonded], j[bonded]), axis=1).astype(np.int32) + 1
+        self._perceived = True
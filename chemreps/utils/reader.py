@@ -0,0 +1,205 @@
+'''
+Streaming readers for multi-record molecule files and datasets so that large
+datasets can be featurized one molecule at a time with constant memory.
+'''
+import os
+import glob
+from .molecule import Molecule
+from .elements import to_symbol
+
+
+def _sdf_records(f):
+    """
+    Yields the lines of each record of an sdf file split on '$$$$'
+    """
+    record = []
+    for line in f:
+        if line.startswith('$$$$'):
+            if any(l.strip() for l in record):
+                yield record
+            record = []
+        else:
+            record.append(line)
+    # last record may not be terminated by '$$$$' (eg. mol files)
+    if any(l.strip() for l in record):
+        yield record
+
+
+def _xyz_records(f):
+    """
+    Yields the lines of each frame of a concatenated xyz file
+    """
+    frame = 0
+    for line in f:
+        # skip blank lines between frames
+        if not line.strip():
+            continue
+        n_atom = int(line.split()[0])
+        record = [line]
+        try:
+            for i in range(n_atom + 1):
+                record.append(next(f))
+        except StopIteration:
+            raise ValueError('{} frame {} is truncated. Expected {} atoms but found {}.'.format(
+                getattr(f, 'name', 'xyz file'), frame, n_atom, max(len(record) - 2, 0)))
+        frame += 1
+        yield record
+
+
+def read_molecules(fname):
+    '''
+    Reads a multi-record sdf or multi-frame xyz file one record at a time
+
+    Parameters
+    ---------
+    fname: string
+        sdf, mol, or xyz file containing one or more molecules
+
+    Yields
+    -------
+    molecule: Molecule
+        Molecule for each record in the file
+    '''
+    accepted_file_formats = ['xyz', 'sdf', 'mol']
+    filetype = os.path.splitext(fname)[1].split('.')[-1]
+    if filetype not in accepted_file_formats:
+        raise NotImplementedError(
+            'file type \'{}\'  is unsupported. Accepted formats: {}.'.format(filetype, accepted_file_formats))
+    with open(fname) as f:
+        if filetype == 'xyz':
+            for record in _xyz_records(f):
+                molecule = Molecule()
+                molecule.parse_xyz(record)
+                yield molecule
+        else:
+            for record in _sdf_records(f):
+                molecule = Molecule()
+                molecule.parse_sdf(record)
+                yield molecule
+
+
+def read_symbols(fname):
+    '''
+    Reads only the atomic symbols of each record of a multi-record sdf or
+    multi-frame xyz file. The coordinates and bonds are skipped so this is
+    much faster than read_molecules when only the composition is needed.
+
+    Parameters
+    ---------
+    fname: string
+        sdf, mol, or xyz file containing one or more molecules
+
+    Yields
+    -------
+    sym: list
+        atomic symbols of each record in the file
+    '''
+    accepted_file_formats = ['xyz', 'sdf', 'mol']
+    filetype = os.path.splitext(fname)[1].split('.')[-1]
+    if filetype not in accepted_file_formats:
+        raise NotImplementedError(
+            'file type \'{}\'  is unsupported. Accepted formats: {}.'.format(filetype, accepted_file_formats))
+    with open(fname) as f:
+        if filetype == 'xyz':
+            for record in _xyz_records(f):
+                n_atom = int(record[0].split()[0])
+                yield [line.split()[0] for line in record[2:2+n_atom]]
+        else:
+            for record in _sdf_records(f):
+                n_atom = int(record[3].split()[0])
+                yield [line.split()[3] for line in record[4:4+n_atom]]
+
+
+def _file_symbols(mol_file):
+    """
+    Returns the atomic symbols of a file holding one molecule
+    """
+    if isinstance(mol_file, Molecule):
+        return mol_file.sym
+    if isinstance(mol_file, tuple):
+        # (at_num, xyz, connect) entry of a MoleculeBatch
+        return to_symbol(mol_file[0])
+    filetype = os.path.splitext(mol_file)[1].split('.')[-1]
+    if filetype in ['xyz', 'sdf', 'mol']:
+        return next(read_symbols(mol_file))
+    # cml and cclib files are parsed as usual
+    return Molecule(mol_file).sym
+
+
+def iter_symbols(dataset):
+    '''
+    Iterates over the atomic symbols of all molecules of a dataset without
+    parsing their coordinates
+
+    Parameters
+    ---------
+    dataset: path, string, or iterable
+        directory of molecule files, a single multi-record sdf/xyz file, or
+        an iterable of molecule filenames, Molecule objects, and/or
+        MoleculeBatch entries (eg. a MoleculeBatch)
+
+    Yields
+    -------
+    sym: list
+        atomic symbols of each molecule in the dataset
+    '''
+    if isinstance(dataset, (str, os.PathLike)):
+        if os.path.isdir(dataset):
+            for mol_file in glob.iglob("{}/*".format(dataset)):
+                yield _file_symbols(mol_file)
+        else:
+            for sym in read_symbols(dataset):
+                yield sym
+    else:
+        for mol_file in dataset:
+            yield _file_symbols(mol_file)
+
+
+def load_molecule(mol_file):
+    '''
+    Returns a Molecule from either a filename or an existing Molecule
+
+    Parameters
+    ---------
+    mol_file: string, Molecule, or tuple
+        molecule filename, already parsed molecule, or (at_num, xyz,
+        connect) entry of a MoleculeBatch
+
+    Returns
+    -------
+    molecule: Molecule
+        parsed molecule
+    '''
+    if isinstance(mol_file, Molecule):
+        return mol_file
+    if isinstance(mol_file, tuple):
+        return Molecule.from_arrays(*mol_file)
+    return Molecule(mol_file)
+
+
+def iter_dataset(dataset):
+    '''
+    Iterates over all molecules of a dataset
+
+    Parameters
+    ---------
+    dataset: path, string, or iterable
+        directory of molecule files, a single multi-record sdf/xyz file, or
+        an iterable of molecule filenames, Molecule objects, and/or
+        MoleculeBatch entries (eg. a MoleculeBatch)
+
+    Yields
+    -------
+    molecule: Molecule
+        each molecule in the dataset
+    '''
+    if isinstance(dataset, (str, os.PathLike)):
+        if os.path.isdir(dataset):
+            for mol_file in glob.iglob("{}/*".format(dataset)):
+                yield Molecule(mol_file)
+        else:
+            for molecule in read_molecules(dataset):
+                yield molecule
+    else:
+        for mol_file in dataset:
+            yield load_molecule(mol_file)
@@ -0,0 +1,99 @@
+'''
+Topology class for storing the connectivity graph, angles, torsions, and their
+bag codes of a molecule so they are computed once and can be shared between
+bag making and featurization.
+'''
+import numpy as np
+from .graphs import gen_csr_graph
+from .graphs import angle_paths
+from .graphs import torsion_paths
+from .bag_codes import angle_codes
+from .bag_codes import torsion_codes
+
+
+class Topology:
+    """
+    Class to store the bonded topology of a molecule
+
+    Attributes
+    ----------
+    n_atom : int
+        number of atoms
+    indptr : array
+        start of each atom's neighbors in indices. Size: (n_atom+1,)
+    indices : array
+        neighbors of all atoms (starting at 0). Size: (2*n_bonds,)
+    angles : array
+        atom indices (starting at 0) of all angles. Size: (n_angles,3)
+    torsions : array
+        atom indices (starting at 0) of all torsions. Size: (n_torsions,4)
+    angle_codes : array
+        integer bag code of each angle (eg. 'CCH'). Size: (n_angles,)
+    torsion_codes : array
+        integer bag code of each torsion (eg. 'HCCN'). Size: (n_torsions,)
+    """
+    __arrays = ['indptr', 'indices', 'angles', 'torsions', 'angle_codes',
+                'torsion_codes']
+
+    def __init__(self, molecule=None):
+        if molecule is not None:
+            self.build(molecule)
+        return None
+
+    def build(self, molecule):
+        """
+        Builds the graph, angles, torsions, and bag codes of a molecule
+
+        Parameters
+        ----------
+        molecule : Molecule
+            molecule with connectivity
+        """
+        self.n_atom = molecule.n_atom
+        self.indptr, self.indices = gen_csr_graph(molecule.connect,
+                                                  molecule.n_atom)
+        self.angles = angle_paths(self.indptr, self.indices)
+        self.torsions = torsion_paths(self.indptr, self.indices)
+
+        # canonical bag codes of the angles and torsions
+        at_num = np.asarray(molecule.at_num, dtype=np.int64)
+        self.angle_codes = angle_codes(at_num[self.angles])
+        self.torsion_codes = torsion_codes(at_num[self.torsions])
+
+    def save(self, fname):
+        """
+        Saves the topology to a .npz file (eg. next to the molecule file)
+
+        Parameters
+        ----------
+        fname : string
+            file to write
+        """
+        with open(fname, 'wb') as f:
+            np.savez(f, n_atom=self.n_atom,
+                     **{key: np.asarray(getattr(self, key))
+                        for key in Topology.__arrays})
+
+    @classmethod
+    def load(cls, fname):
+        """
+        Loads a topology saved with Topology.save
+
+        Parameters
+        ----------
+        fname : string
+            file to read
+
+        Returns
+        -------
+        topology : Topology
+            loaded topology
+        """
+        topology = cls()
+        with np.load(fname) as data:
+            topology.n_atom = int(data['n_atom'])
+            for key in Topology.__arrays:
+                setattr(topology, key, data[key])
+        topology.angles = topology.angles.reshape(-1, 3)
+        topology.torsions = topology.torsions.reshape(-1, 4)
+        return topology
@@ -20,7 +20,7 @@ def setup_chemreps():
         long_description_content_type='text/markdown',
         install_requires=[
             "cclib>=1.5",
-            "numpy>=1.12",
+            "numpy>=1.15",
             "scipy",
             "qcelemental"
         ],
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest as pt
+from chemreps.dataset import LoadBags
+from chemreps.utils import bag_codes
+
+
+def test_codes():
+    assert bag_codes.key_to_code('CH') == 6 * 128 + 1
+    assert bag_codes.decode(6 * 128 + 1) == 'CH'
+    assert bag_codes.decode([8, 1, 17 * 128 + 6]) == ['O', 'H', 'ClC']
+
+    # every key of the QM9 bags maps to a code and back
+    for rep in ['BoB', 'BAT', 'JustBonds']:
+        keys = list(LoadBags(rep, 'QM9').bag_sizes.keys())
+        codes = [bag_codes.key_to_code(key) for key in keys]
+        assert len(set(codes)) == len(keys)
+        assert bag_codes.decode(codes) == keys
+
+
+def test_canonical_codes():
+    assert bag_codes.decode(bag_codes.pair_codes([1, 6, 8], [6, 1, 7])) == ['CH', 'CH', 'ON']
+    assert bag_codes.decode(bag_codes.bond_codes([1, 6, 6], [6, 1, 8])) == ['HC', 'HC', 'OC']
+    assert bag_codes.decode(bag_codes.angle_codes([[1, 6, 6], [6, 6, 1]])) == ['CCH', 'CCH']
+    assert bag_codes.decode(bag_codes.torsion_codes([[8, 6, 7, 1], [6, 7, 6, 6]])) == ['HNCO', 'CNCC']
+
+    codes = bag_codes.pair_codes([1, 6, 1], [6, 6, 6])
+    assert bag_codes.count_codes(codes) == {'CC': 1, 'CH': 2}
+    assert bag_codes.count_codes(codes, decoded=False) == {6 * 128 + 6: 1, 6 * 128 + 1: 2}
@@ -125,5 +125,34 @@ def test_bag_of_bonds():
         bad_sizes = OrderedDict([('C', 1), ('CC', 1), ('CH', 1), ('H', 1), ('HH', 153), ('N', 2), ('NC', 32), ('NH', 36), ('NN', 1), ('O', 5), ('OC', 80), ('OH', 90), ('ON', 10), ('OO', 10), ('S', 1), ('SC', 16), ('SH', 18), ('SN', 2), ('SO', 5)])
         rep = bag_of_bonds('data/sdf/butane.sdf', bagger.bags, bad_sizes)
 
+def test_bag_of_bonds_loop():
+    # compare against the original pair by pair implementation
+    from chemreps.utils.molecule import Molecule
+    from chemreps.utils.calcs import length
+    bagger = BagMaker('BoB', 'data/sdf/')
+    for mol_file in ['data/sdf/penicillin.sdf', 'data/cclib/butane.cclib']:
+        mol = Molecule(mol_file)
+        bag_set = {key: [] for key in bagger.bags}
+        for i in range(mol.n_atom):
+            for j in range(i, mol.n_atom):
+                atomi, atomj = mol.sym[i], mol.sym[j]
+                zi, zj = mol.at_num[i], mol.at_num[j]
+                if i == j:
+                    bag_set[atomi].append(0.5 * zi ** 2.4)
+                else:
+                    if zj > zi:
+                        atomi, atomj = atomj, atomi
+                    bag_set[atomi + atomj].append((zi * zj) / length(mol, i, j))
+        bob_true = []
+        for key in bagger.bag_sizes:
+            bag = sorted(bag_set[key], reverse=True)
+            bob_true.extend(bag + [0.] * (bagger.bag_sizes[key] + 1 - len(bag)))
+        bob_true = np.array(bob_true, dtype=np.float16)
+
+        rep = bag_of_bonds(mol_file, bagger.bags, bagger.bag_sizes)
+        assert rep.dtype == np.float16
+        assert np.array_equal(rep, bob_true)
+
+
 if __name__ == "__main__":
     print("This is a test of the bag of bonds representation in chemreps to be evaluated with pytest")
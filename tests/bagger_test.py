@@ -1,5 +1,12 @@
+import glob
 import numpy as np
 from chemreps.bagger import BagMaker
+from chemreps.bagger import _split_dataset
+from chemreps.bag_of_bonds import bag_of_bonds
+from chemreps.bat import bat
+from chemreps.just_bonds import bonds
+from chemreps.utils.bag_handler import migrate_features
+from chemreps.utils.reader import read_molecules
 import pytest as pt
 
 
@@ -8,5 +15,203 @@ def test_bagger_general():
         bagger = BagMaker('histograms', 'data/sdf/')
 
 
+def test_bag_layout():
+    bagger = BagMaker('BoB', 'data/sdf/')
+    layout = bagger.layout
+    assert len(layout) == len(bagger.bag_sizes)
+    assert layout.n_features == sum(bagger.bag_sizes.values()) + len(bagger.bag_sizes)
+    assert layout['C'] == (0, 17)
+    assert layout['CC'] == (17, 121)
+
+    mol_files = ['data/sdf/butane.sdf', 'data/sdf/water.sdf']
+    features = layout.zeros(len(mol_files))
+    for i, mol_file in enumerate(mol_files):
+        bag_of_bonds(mol_file, bagger.bags, layout, out=features[i])
+        assert np.array_equal(features[i], bag_of_bonds(mol_file, bagger.bags, bagger.bag_sizes))
+
+    assert layout.slots([6 * 128 + 1, 6]).tolist() == [2, 0]
+    with pt.raises(KeyError):
+        layout.slots([9])
+
+    row = layout.scatter(layout.zeros(), [6 * 128 + 6] * 3, [1., 3., 2.])
+    assert row[17:21].tolist() == [3., 2., 1., 0.]
+    with pt.raises(Exception, match='C-bag size is too small. Increase size to 17'):
+        layout.scatter(layout.zeros(), [6] * 17, np.ones(17))
+
+
+def test_bagger_parallel(tmp_path, multi_sdf):
+    fname, mol_files = multi_sdf
+
+    for rep in ['BoB', 'BAT', 'JustBonds']:
+        serial = BagMaker(rep, 'data/sdf/')
+        for dataset in ['data/sdf/', mol_files, fname]:
+            bagger = BagMaker(rep, dataset, n_jobs=2)
+            assert list(bagger.bag_sizes.items()) == list(serial.bag_sizes.items())
+            assert bagger.layout.n_features == serial.layout.n_features
+
+    serial = BagMaker('BAT', fname, keep_topologies=True)
+    bagger = BagMaker('BAT', fname, keep_topologies=True, n_jobs=2)
+    assert sorted(bagger.topologies) == list(range(len(mol_files)))
+    for k in serial.topologies:
+        assert np.array_equal(bagger.topologies[k].torsions,
+                              serial.topologies[k].torsions)
+
+    with pt.raises(NotImplementedError):
+        BagMaker('JustBonds', 'data/xyz/', n_jobs=2)
+
+    # streams are read lazily and Molecules are sent without cached data
+    bagger = BagMaker('BAT', read_molecules(fname), keep_topologies=True, n_jobs=2)
+    assert bagger.bag_sizes == serial.bag_sizes
+    assert sorted(bagger.topologies) == list(range(len(mol_files)))
+    read = []
+
+    def stream():
+        for mol in read_molecules(fname):
+            mol.topology
+            read.append(mol)
+            yield mol
+
+    chunk, first = next(_split_dataset(stream(), 2, chunk_size=2))
+    assert len(read) == 2 and first == 0
+    assert [mol.ftype for mol in chunk] == ['sdf', 'sdf']
+    assert read[0]._topology is not None and chunk[0]._topology is None
+    assert np.array_equal(chunk[1].connect, read[1].connect)
+
+    # sidecar index in another directory
+    index_dir = tmp_path / 'index'
+    index_dir.mkdir()
+    fname = str(tmp_path / 'other.sdf')
+    with open(fname, 'w') as f:
+        with open('data/sdf/butane.sdf') as m:
+            f.write(m.read())
+    bagger = BagMaker('BoB', fname, n_jobs=2, index_dir=str(index_dir))
+    assert bagger.bag_sizes == BagMaker('BoB', 'data/sdf/butane.sdf').bag_sizes
+    assert (index_dir / 'other.sdf.idx.npz').exists()
+    assert not (tmp_path / 'other.sdf.idx.npz').exists()
+
+    for n_jobs in [0, -2, 1.5]:
+        with pt.raises(ValueError):
+            BagMaker('BoB', 'data/sdf/', n_jobs=n_jobs)
+
+
+def test_bagger_multi():
+    reps = ['BoB', 'BAT', 'JustBonds']
+    bag_makers = BagMaker.multi(reps, 'data/sdf/', keep_topologies=True)
+    assert list(bag_makers.keys()) == reps
+    for rep in reps:
+        serial = BagMaker(rep, 'data/sdf/')
+        assert list(bag_makers[rep].bag_sizes.items()) == list(serial.bag_sizes.items())
+        assert bag_makers[rep].layout.keys == serial.layout.keys
+    assert len(bag_makers['BAT'].topologies) == 4
+    assert bag_makers['BoB'].topologies == {}
+
+    # BoB alone also works for files without bonds
+    bag_makers = BagMaker.multi(['BoB'], 'data/xyz/', n_jobs=2)
+    assert bag_makers['BoB'].bag_sizes == BagMaker('BoB', 'data/xyz/').bag_sizes
+
+    with pt.raises(NotImplementedError):
+        BagMaker.multi(['BoB', 'JustBonds'], 'data/xyz/')
+    with pt.raises(NotImplementedError):
+        BagMaker.multi(['BoB', 'histograms'], 'data/sdf/')
+
+
+def test_bagger_composition():
+    for dataset in ['data/sdf/', 'data/xyz/', 'data/cclib/']:
+        bagger = BagMaker('BoB', dataset, composition=True)
+        serial = BagMaker('BoB', dataset)
+        assert list(bagger.bag_sizes.items()) == list(serial.bag_sizes.items())
+        assert bagger.layout.n_features == serial.layout.n_features
+        assert all(type(key) is str for key in bagger.bag_sizes)
+        assert all(type(key) is str for key in bagger.layout.keys)
+    # no OO bag for a single oxygen
+    bagger = BagMaker('BoB', ['data/sdf/water.sdf'], composition=True)
+    assert bagger.bag_sizes == {'H': 2, 'HH': 1, 'O': 1, 'OH': 2}
+
+
+def test_bagger_update(tmp_path):
+    mol_files = sorted(glob.glob('data/sdf/*.sdf'))
+    for rep in ['BoB', 'BAT', 'JustBonds']:
+        bagger = BagMaker(rep, mol_files[:2])
+        old_sizes = dict(bagger.bag_sizes)
+        changed, grown = bagger.update(mol_files[2:])
+        full = BagMaker(rep, mol_files)
+        assert changed
+        assert list(bagger.bag_sizes.items()) == list(full.bag_sizes.items())
+        assert bagger.layout.n_features == full.layout.n_features
+        for key, (previous, size) in grown.items():
+            assert previous == old_sizes.get(key)
+            assert size == full.bag_sizes[key]
+        assert [key for key in full.bag_sizes
+                if full.bag_sizes[key] != old_sizes.get(key)] == list(grown.keys())
+
+        # molecules that were already seen do not change the layout
+        layout = bagger.layout
+        assert bagger.update(mol_files[:1]) == (False, {})
+        assert bagger.layout is layout
+
+        # save and load the bag sizes
+        fname = str(tmp_path / '{}.pkl'.format(rep))
+        bagger.save(fname)
+        loaded = BagMaker.load(fname)
+        assert loaded.rep_str == rep
+        assert list(loaded.bag_sizes.items()) == list(bagger.bag_sizes.items())
+        assert loaded.bags == bagger.bags
+        assert loaded.layout.n_features == bagger.layout.n_features
+
+    bagger = BagMaker('BoB', ['data/sdf/water.sdf'], composition=True)
+    changed, grown = bagger.update(['data/sdf/butane.sdf'])
+    assert grown['H'] == (2, 10)
+    assert grown['C'] == (None, 4)
+
+    with pt.raises(Exception):
+        BagMaker().update(mol_files)
+
+
+def test_migrate_features(tmp_path):
+    mol_files = sorted(glob.glob('data/sdf/*.sdf'))
+    featurizers = {'BoB': bag_of_bonds, 'BAT': bat, 'JustBonds': bonds}
+    for rep, featurize in featurizers.items():
+        bagger = BagMaker(rep, mol_files[:2])
+        old_layout = bagger.layout
+        features = old_layout.zeros(2)
+        for k, mol_file in enumerate(mol_files[:2]):
+            featurize(mol_file, bagger.bags, old_layout, out=features[k])
+        changed, grown = bagger.update(mol_files[2:])
+        assert changed
+
+        true = np.array([featurize(mol_file, bagger.bags, bagger.bag_sizes)
+                         for mol_file in mol_files[:2]])
+        new = migrate_features(features, old_layout, bagger.layout, chunk_size=1)
+        assert new.dtype == features.dtype
+        assert np.array_equal(new, true)
+        assert np.array_equal(migrate_features(features[1], old_layout,
+                                               bagger.bag_sizes), true[1])
+
+    # memory-mapped features in and out
+    fname = str(tmp_path / 'features.npy')
+    np.save(fname, features)
+    out = np.lib.format.open_memmap(str(tmp_path / 'new.npy'), mode='w+',
+                                    dtype=features.dtype, shape=true.shape)
+    migrate_features(np.load(fname, mmap_mode='r'), old_layout, bagger.layout, out)
+    out.flush()
+    assert np.array_equal(np.load(str(tmp_path / 'new.npy')), true)
+
+    # layouts can only grow
+    with pt.raises(Exception):
+        migrate_features(true, bagger.layout, old_layout)
+
+
+def test_bag_layout_cache():
+    from chemreps.utils.bag_handler import bag_layout
+    bagger = BagMaker('BoB', 'data/sdf/')
+    bag_sizes = dict(bagger.bag_sizes)
+    layout = bag_layout(bag_sizes)
+    assert bag_layout(bag_sizes) is layout
+    assert bag_layout(bagger.layout) is bagger.layout
+    # changed bag sizes get a new layout
+    bag_sizes['C'] += 1
+    assert bag_layout(bag_sizes).n_features == layout.n_features + 1
+
+
 if __name__ == "__main__":
     print("This is a test of the bagger, bag updater, and bag organizer in chemreps to be evaluated with pytest")
@@ -0,0 +1,75 @@
+import glob
+import numpy as np
+import pytest as pt
+from chemreps.utils.batch import MoleculeBatch
+from chemreps.utils.molecule import Molecule
+from chemreps.bagger import BagMaker
+from chemreps.bag_of_bonds import bag_of_bonds
+from chemreps.just_bonds import bonds
+from chemreps.coulomb_matrix import coulomb_matrix
+
+
+def test_batch():
+    mol_files = sorted(glob.glob('data/sdf/*.sdf')) + ['data/xyz/butane.xyz']
+    batch = MoleculeBatch.from_dataset(mol_files)
+    assert len(batch) == len(mol_files)
+    assert batch.at_num.dtype == np.int8
+    assert batch.xyz.dtype == np.float32
+    assert batch.connect.dtype == np.int32
+
+    for k, mol_file in enumerate(mol_files):
+        mol = Molecule(mol_file)
+        at_num, xyz, connect = batch[k]
+        assert at_num.tolist() == mol.at_num
+        assert np.allclose(xyz, mol.xyz, atol=1e-5)
+        assert np.array_equal(connect, mol.connect)
+
+    # slices share the flat arrays
+    sub = batch[1:3]
+    assert len(sub) == 2
+    assert np.shares_memory(sub[0][1], batch.xyz)
+    assert sub.n_atoms.tolist() == batch.n_atoms[1:3].tolist()
+    assert np.array_equal(sub[1][0], batch[2][0])
+    assert len([arrays for arrays in sub]) == 2
+
+    with pt.raises(IndexError):
+        batch[len(mol_files)]
+
+
+def test_batch_representations():
+    mol_files = sorted(glob.glob('data/sdf/*.sdf'))
+    batch = MoleculeBatch.from_dataset('data/sdf/')
+    for rep in ['BoB', 'BAT', 'JustBonds']:
+        assert BagMaker(rep, batch).bag_sizes == BagMaker(rep, 'data/sdf/').bag_sizes
+    assert BagMaker('BoB', batch, composition=True).bag_sizes == \
+        BagMaker('BoB', 'data/sdf/').bag_sizes
+
+    batch = MoleculeBatch.from_dataset(mol_files)
+    bagger = BagMaker('JustBonds', mol_files)
+    for k, mol_file in enumerate(mol_files):
+        mol = Molecule.from_arrays(*batch[k])
+        assert mol.ftype == 'batch'
+        # the batch arrays are used without copies
+        assert np.shares_memory(mol.xyz, batch.xyz)
+        assert np.shares_memory(mol.at_num, batch.at_num)
+        assert mol.sym == Molecule(mol_file).sym
+        # float32 coordinates only change the last digits
+        assert np.allclose(bonds(batch[k], bagger.bags, bagger.bag_sizes),
+                           bonds(mol_file, bagger.bags, bagger.bag_sizes), rtol=1e-2)
+        assert np.allclose(coulomb_matrix(batch[k], 50),
+                           coulomb_matrix(mol_file, 50), rtol=1e-2)
+
+
+def test_batch_without_bonds():
+    batch = MoleculeBatch.from_dataset(['data/xyz/butane.xyz'], bonds=False)
+    assert batch.connect is None
+    assert batch.n_bonds.tolist() == [0]
+    at_num, xyz, connect = batch[0]
+    assert connect is None
+    # bonds are perceived on first access instead
+    mol = Molecule.from_arrays(at_num, xyz, connect)
+    assert mol._connect is None
+    assert mol.n_connect == 13
+    bagger = BagMaker('BoB', 'data/xyz/')
+    assert bag_of_bonds(batch[0], bagger.bags, bagger.bag_sizes).shape == \
+        (bagger.layout.n_features,)
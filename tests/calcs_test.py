@@ -0,0 +1,33 @@
+import numpy as np
+import pytest as pt
+from chemreps.utils.molecule import Molecule
+from chemreps.utils import calcs
+
+
+def test_lengths():
+    mol = Molecule('data/sdf/penicillin.sdf')
+    r = calcs.distance_matrix(mol.xyz)
+    assert r.shape == (mol.n_atom, mol.n_atom)
+    assert np.allclose(r, r.T)
+    assert np.array_equal(mol.distances, r)
+
+    i, j = np.triu_indices(mol.n_atom, k=1)
+    rij = calcs.lengths(mol, i, j)
+    assert rij.dtype == np.float16
+    assert np.array_equal(rij, [calcs.length(mol, a, b) for a, b in zip(i, j)])
+
+
+def test_angles_torsions():
+    mol = Molecule('data/sdf/butane.sdf')
+    idx = np.array([[0, 1, 3], [4, 0, 2], [11, 3, 1]])
+    theta = calcs.angles(mol.xyz, idx)
+    assert np.allclose(theta, [calcs.angle(mol, *a) for a in idx], atol=1e-3)
+
+    idx = np.array([[2, 0, 1, 3], [4, 0, 1, 6], [8, 2, 0, 1]])
+    dihedral = calcs.torsions(mol.xyz, idx)
+    assert np.allclose(dihedral, [calcs.torsion(mol, *t) for t in idx])
+
+    # linear geometries do not raise math domain errors
+    xyz = np.array([[0., 0., 0.], [1., 0., 0.], [2., 0., 0.], [3., 1., 0.]])
+    assert np.allclose(calcs.angles(xyz, [[0, 1, 2]]), np.pi)
+    assert np.all(np.isfinite(calcs.torsions(xyz, [[0, 1, 2, 3]])))
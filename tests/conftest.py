@@ -0,0 +1,18 @@
+import glob
+import pytest as pt
+
+
+@pt.fixture
+def multi_sdf(tmp_path):
+    '''
+    Writes every molecule in data/sdf/ to one $$$$ separated sdf file and
+    returns its filename with the sorted molecule files it was built from.
+    '''
+    mol_files = sorted(glob.glob('data/sdf/*.sdf'))
+    fname = str(tmp_path / 'dataset.sdf')
+    with open(fname, 'w') as f:
+        for mol_file in mol_files:
+            with open(mol_file) as m:
+                f.write(m.read())
+            f.write('$$$$\n')
+    return fname, mol_files
@@ -1,4 +1,9 @@
+import glob
 from chemreps.coulomb_matrix import coulomb_matrix
+from chemreps.coulomb_matrix import coulomb_matrices
+from chemreps.coulomb_matrix import random_sorted_coulomb_matrices
+from chemreps.utils.batch import MoleculeBatch
+from chemreps.utils.molecule import Molecule
 import numpy as np
 import pytest as pt
 
@@ -30,5 +35,85 @@ def test_cm():
         rep = coulomb_matrix('data/xyz/butane.xyz', size=1)
 
 
+def test_cm_batch():
+    mol_files = sorted(glob.glob('data/sdf/*.sdf')) + ['data/xyz/butane.xyz']
+    reps = coulomb_matrices(mol_files, size=50)
+    assert reps.shape == (len(mol_files), 50*51//2)
+    assert reps.dtype == np.float16
+    for k, mol_file in enumerate(mol_files):
+        assert np.array_equal(reps[k], coulomb_matrix(mol_file, size=50))
+
+    # float32 coordinates of a batch only change the last digits
+    batch = MoleculeBatch.from_dataset(mol_files)
+    assert np.allclose(coulomb_matrices(batch, size=50), reps, rtol=1e-2)
+    assert coulomb_matrices([], size=5).shape == (0, 15)
+
+    with pt.raises(Exception):
+        coulomb_matrices(mol_files, size=10)
+
+
+def test_cm_modes():
+    mol = Molecule('data/sdf/penicillin.sdf')
+    shuffled = Molecule('data/sdf/penicillin.sdf')
+    perm = np.random.RandomState(0).permutation(mol.n_atom)
+    shuffled.xyz = mol.xyz[perm]
+    shuffled.sym = [mol.sym[p] for p in perm]
+    shuffled.at_num = [mol.at_num[p] for p in perm]
+
+    # sorted CM has the same entries in a permutation invariant order
+    cm = coulomb_matrix(mol, size=50)
+    sorted_cm = coulomb_matrix(mol, size=50, mode='sorted')
+    assert sorted_cm.shape == cm.shape
+    assert np.array_equal(np.sort(sorted_cm), np.sort(cm))
+    assert np.allclose(coulomb_matrix(shuffled, size=50, mode='sorted'), sorted_cm)
+
+    # eigenspectrum of the zero padded CM sorted by absolute value
+    i, j = np.tril_indices(50)
+    sq = np.zeros((50, 50))
+    sq[i, j] = cm
+    sq[j, i] = cm
+    eigs = np.linalg.eigvalsh(sq)
+    eigs = eigs[np.argsort(-np.abs(eigs))]
+    spectrum = coulomb_matrix(mol, size=50, mode='eigenspectrum')
+    assert spectrum.shape == (50,)
+    assert np.allclose(spectrum, eigs, rtol=1e-3, atol=1e-2)
+    assert np.allclose(coulomb_matrix(shuffled, size=50, mode='eigenspectrum'),
+                       spectrum, rtol=1e-3, atol=1e-2)
+
+    # batches match single molecules
+    mol_files = sorted(glob.glob('data/sdf/*.sdf'))
+    for mode in ['sorted', 'eigenspectrum']:
+        reps = coulomb_matrices(mol_files, size=50, mode=mode)
+        for k, mol_file in enumerate(mol_files):
+            assert np.allclose(reps[k], coulomb_matrix(mol_file, 50, mode))
+
+    with pt.raises(NotImplementedError):
+        coulomb_matrix(mol, size=50, mode='random')
+
+
+def test_cm_random_sorted():
+    mol_files = sorted(glob.glob('data/sdf/*.sdf'))
+    reps = list(random_sorted_coulomb_matrices(mol_files, size=50, n_samples=4,
+                                               random_state=0))
+    assert len(reps) == len(mol_files)
+    for k, mol_file in enumerate(mol_files):
+        assert reps[k].shape == (4, 50*51//2)
+        cm = np.sort(coulomb_matrix(mol_file, size=50))
+        for rep in reps[k]:
+            assert np.array_equal(np.sort(rep), cm)
+
+    # seeded runs are reproducible
+    again = random_sorted_coulomb_matrices(mol_files, size=50, n_samples=4,
+                                           random_state=0)
+    assert all(np.array_equal(a, b) for a, b in zip(reps, again))
+
+    # without noise every copy is the row norm sorted CM
+    for rep, mol_file in zip(random_sorted_coulomb_matrices(mol_files, 50, 2, 0.),
+                             mol_files):
+        sorted_cm = coulomb_matrix(mol_file, size=50, mode='sorted')
+        assert np.array_equal(rep[0], sorted_cm)
+        assert np.array_equal(rep[1], sorted_cm)
+
+
 if __name__ == "__main__":
     print("This is a test of the coulomb matrix representation in chemreps to be evaluated with pytest")
@@ -0,0 +1,20 @@
+import numpy as np
+import pytest as pt
+import qcelemental as qcel
+from chemreps.utils import elements
+
+
+def test_registry():
+    for sym in ['H', 'C', 'N', 'O', 'F', 'S', 'Cl', 'Br']:
+        z = qcel.periodictable.to_Z(sym)
+        assert elements.symbols[z] == sym
+        assert elements.covalent_radii[z] == qcel.covalentradii.get(sym, units='angstrom')
+        assert elements.self_interaction[z] == 0.5 * z ** 2.4
+
+    assert elements.to_z(['C', 'H', 'Cl', 'D']).tolist() == [6, 1, 17, 1]
+    assert elements.to_z(['H', 'C', 'H', 'D', 'C']).tolist() == [1, 6, 1, 1, 6]
+    assert elements.to_z([]).tolist() == []
+    assert elements.to_symbol(np.array([8, 1, 1])) == ['O', 'H', 'H']
+
+    with pt.raises(KeyError):
+        elements.to_z(['C', 'Gh'])
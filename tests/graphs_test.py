@@ -0,0 +1,35 @@
+import numpy as np
+import pytest as pt
+from chemreps.utils.molecule import Molecule
+from chemreps.utils import graphs
+
+
+def test_csr_graph():
+    mol = Molecule('data/sdf/butane.sdf')
+    indptr, indices = graphs.gen_csr_graph(mol.connect, mol.n_atom)
+    assert indptr.tolist() == [0, 4, 8, 12, 16, 17, 18, 19, 20, 21, 22, 23, 24, 25, 26]
+    assert indices[indptr[0]:indptr[1]].tolist() == [1, 2, 4, 5]
+
+    adjacency = graphs.csr_to_sparse(indptr, indices)
+    assert adjacency.shape == (14, 14)
+    assert (adjacency != adjacency.T).nnz == 0
+    assert adjacency.nnz == 2 * mol.n_connect
+
+    graph = graphs.gen_graph(mol.connect, mol.n_atom)
+    assert graph[1] == [2, 3, 5, 6]
+    assert graph[14] == [4]
+
+
+def test_paths():
+    for mol_file in ['data/sdf/butane.sdf', 'data/sdf/penicillin.sdf', 'data/sdf/benzoic_acid.sdf']:
+        mol = Molecule(mol_file)
+        graph = graphs.gen_graph(mol.connect, mol.n_atom)
+        indptr, indices = graphs.gen_csr_graph(mol.connect, mol.n_atom)
+        for length, paths in [(3, graphs.angle_paths), (4, graphs.torsion_paths)]:
+            connections = []
+            for atom in graph:
+                graphs.dfs_connections(graph, atom, length, connections)
+            dfs = sorted(tuple(c - 1 for c in conn) for conn in connections)
+            enum = paths(indptr, indices)
+            assert enum.dtype == np.int32
+            assert sorted(map(tuple, enum.tolist())) == dfs
@@ -0,0 +1,45 @@
+import os
+import numpy as np
+import pytest as pt
+from chemreps.utils.index import MoleculeIndex
+from chemreps.utils.reader import read_molecules
+
+
+def test_sdf_index(multi_sdf):
+    fname, mol_files = multi_sdf
+    index = MoleculeIndex(fname)
+    assert os.path.exists(fname + '.idx.npz')
+    assert len(index) == len(mol_files)
+    mols = list(read_molecules(fname))
+    assert index.n_atoms.tolist() == [mol.n_atom for mol in mols]
+    for k in [2, 0, 3, 1]:
+        mol = index[k]
+        assert mol.sym == mols[k].sym
+        assert np.allclose(mol.xyz, mols[k].xyz)
+        assert np.allclose(mol.connect, mols[k].connect)
+
+    # reuse the saved sidecar index
+    index = MoleculeIndex(fname)
+    assert index[-1].n_atom == mols[-1].n_atom
+    index.close()
+
+
+def test_xyz_index(tmp_path):
+    fname = str(tmp_path / 'frames.xyz')
+    with open('data/xyz/butane.xyz') as f:
+        frame = f.read()
+    with open(fname, 'w') as f:
+        f.write(frame * 3)
+    index = MoleculeIndex(fname, index_file=str(tmp_path / 'frames.idx'))
+    assert len(index) == 3
+    assert index.n_atoms.tolist() == [14, 14, 14]
+    assert np.array_equal(index[2].connect, index[0].connect)
+
+    with pt.raises(NotImplementedError):
+        MoleculeIndex('data/cml/butane.cml')
+
+    # truncated last frame
+    with open(fname, 'w') as f:
+        f.write(frame + '3\nwater\nO 0.0 0.0 0.0\nH 0.0 0.0 1.0\n')
+    with pt.raises(ValueError, match='frame 1 is truncated. Expected 3 atoms but found 2'):
+        MoleculeIndex(fname, index_file=str(tmp_path / 'truncated.idx'))
@@ -48,5 +48,61 @@ def test_connect_mat():
     assert np.allclose(connect_mat_true,d.connect)
 
 
+def test_connect_mat_pairwise():
+    d = Molecule('data/sdf/penicillin.sdf')
+    bonds_true = [[i+1, j+1] for i in range(d.n_atom)
+                  for j in range(i+1, d.n_atom) if d.bond(i, j)]
+    d.connectivity_matrix()
+    assert d.connect.dtype == np.int32
+    assert d.connect.tolist() == bonds_true
+
+
+def test_connect_mat_kdtree():
+    d = Molecule('data/sdf/penicillin.sdf')
+    d.connectivity_matrix()
+    all_pairs = d.connect.copy()
+    d.connectivity_matrix(kdtree_threshold=0)
+    assert np.array_equal(all_pairs, d.connect)
+
+
+def test_lazy_connect():
+    d = Molecule('data/xyz/butane.xyz')
+    assert d._connect is None and d._distances is None
+    assert d.n_connect == 13
+    assert d._connect is not None
+
+    d = Molecule('data/cclib/butane.cclib')
+    assert d.n_connect == 13
+    assert d.distances.shape == (14, 14)
+    assert np.isclose(d.distances[0, 1], np.linalg.norm(d.xyz[0] - d.xyz[1]))
+
+
+def test_cache_reset():
+    from chemreps.coulomb_matrix import coulomb_matrix
+    d = Molecule('data/xyz/butane.xyz')
+    cm = coulomb_matrix(d, 20)
+    assert d.n_connect == 13
+    # new coordinates reset the distances and perceived bonds
+    d.xyz = d.xyz * 3
+    scaled = coulomb_matrix(d, 20)
+    i, j = np.tril_indices(20)
+    assert np.allclose(scaled[i == j], cm[i == j])
+    assert np.allclose(scaled[i != j], cm[i != j] / 3, rtol=1e-2)
+    assert d.n_connect == 0
+    assert len(d.topology.angles) == 0
+
+    # bonds read from a file are kept but the topology is rebuilt
+    d = Molecule('data/sdf/butane.sdf')
+    assert len(d.topology.angles) == 24
+    d.at_num = [8 if z == 6 else z for z in d.at_num]
+    d.sym = ['O' if s == 'C' else s for s in d.sym]
+    assert d.n_connect == 13
+    assert 'OOO' in [d.sym[a] + d.sym[b] + d.sym[c] for a, b, c in d.topology.angles]
+
+    # parsing a new file drops the bonds of the old one
+    d.import_file('data/xyz/butane.xyz')
+    assert d._connect is None
+
+
 if __name__ == "__main__":
     print("This is a test for chemreps to be evaluated with pytest")
\ No newline at end of file
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest as pt
+from chemreps.bagger import BagMaker
+from chemreps.bag_of_bonds import bag_of_bonds
+from chemreps.utils.molecule import Molecule
+from chemreps.utils.reader import read_molecules
+from chemreps.utils.reader import read_symbols
+from chemreps.utils.reader import iter_symbols
+
+
+def test_read_sdf(multi_sdf):
+    fname, mol_files = multi_sdf
+    mols = list(read_molecules(fname))
+    assert len(mols) == len(mol_files)
+    for mol, mol_file in zip(mols, mol_files):
+        ref = Molecule(mol_file)
+        assert mol.n_atom == ref.n_atom
+        assert mol.sym == ref.sym
+        assert np.allclose(mol.xyz, ref.xyz)
+        assert np.allclose(mol.connect, ref.connect)
+
+
+def test_read_xyz(tmp_path):
+    fname = str(tmp_path / 'frames.xyz')
+    with open('data/xyz/butane.xyz') as f:
+        frame = f.read()
+    with open(fname, 'w') as f:
+        f.write(frame + '\n' + frame)
+    mols = list(read_molecules(fname))
+    assert len(mols) == 2
+    assert mols[1].n_atom == 14
+    assert np.array_equal(mols[0].connect, mols[1].connect)
+
+    with pt.raises(NotImplementedError):
+        list(read_molecules('data/cml/butane.cml'))
+
+
+def test_bagmaker_stream(multi_sdf):
+    fname, mol_files = multi_sdf
+    for rep in ['BoB', 'BAT', 'JustBonds']:
+        assert BagMaker(rep, fname).bag_sizes == BagMaker(rep, 'data/sdf/').bag_sizes
+
+    bagger = BagMaker('BoB', read_molecules(fname))
+    for mol in read_molecules(fname):
+        rep = bag_of_bonds(mol, bagger.bags, bagger.bag_sizes)
+        assert rep.shape == (sum(bagger.bag_sizes.values()) + len(bagger.bag_sizes),)
+
+
+def test_read_symbols(multi_sdf):
+    fname, mol_files = multi_sdf
+    assert list(read_symbols(fname)) == [mol.sym for mol in read_molecules(fname)]
+    assert list(iter_symbols(fname)) == [Molecule(f).sym for f in mol_files]
+
+    mol_files = ['data/xyz/butane.xyz', 'data/cml/butane.cml',
+                 'data/cclib/butane.cclib', Molecule('data/sdf/butane.sdf')]
+    syms = list(iter_symbols(mol_files))
+    assert syms[:3] == [Molecule(f).sym for f in mol_files[:3]]
+    assert syms[3] == mol_files[3].sym
+
+    with pt.raises(NotImplementedError):
+        list(read_symbols('data/cml/butane.cml'))
+
+
+def test_read_truncated_xyz(tmp_path):
+    fname = str(tmp_path / 'truncated.xyz')
+    with open(fname, 'w') as f:
+        f.write('3\nwater\nO 0.0 0.0 0.0\nH 0.0 0.0 1.0\n')
+    with pt.raises(ValueError, match='frame 0 is truncated'):
+        list(read_molecules(fname))
+    with pt.raises(ValueError, match='truncated.xyz'):
+        list(read_symbols(fname))
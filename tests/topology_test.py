@@ -0,0 +1,33 @@
+import numpy as np
+import pytest as pt
+from chemreps.bagger import BagMaker
+from chemreps.bat import bat
+from chemreps.utils.molecule import Molecule
+from chemreps.utils.topology import Topology
+from chemreps.utils.bag_codes import decode
+
+
+def test_topology(tmp_path):
+    mol = Molecule('data/sdf/butane.sdf')
+    topology = mol.topology
+    assert topology is mol.topology
+    assert topology.angles.shape == (24, 3)
+    assert topology.torsions.shape == (27, 4)
+    assert sorted(set(decode(topology.angle_codes))) == ['CCC', 'CCH', 'HCH']
+    assert sorted(set(decode(topology.torsion_codes))) == ['CCCC', 'CCCH', 'HCCH']
+
+    fname = str(tmp_path / 'butane.top.npz')
+    topology.save(fname)
+    loaded = Topology.load(fname)
+    assert np.array_equal(loaded.torsions, topology.torsions)
+    assert np.array_equal(loaded.angle_codes, topology.angle_codes)
+
+
+def test_bagmaker_topologies():
+    bagger = BagMaker('BAT', 'data/sdf/', keep_topologies=True)
+    assert len(bagger.topologies) == 4
+    topology = bagger.topologies['data/sdf/penicillin.sdf']
+    rep = bat('data/sdf/penicillin.sdf', bagger.bags, bagger.bag_sizes,
+              topology=topology)
+    assert np.array_equal(rep, bat('data/sdf/penicillin.sdf', bagger.bags,
+                                   bagger.bag_sizes))